@@ -4,6 +4,8 @@ from .models import (
 )
 from .persistence import (
     WorkloadManager, MigrationManager, 
+    SqliteWorkloadManager, SqliteMigrationManager,
+    InMemoryWorkloadManager, InMemoryMigrationManager,
     PersistenceError, ObjectNotFoundError, DuplicateIPError
 )
 
@@ -12,5 +14,7 @@ __all__ = [
     'Workload', 'Migration', 'MigrationTarget', 'Credentials',
     'Storage', 'MountPoint', 'CloudType', 'MigrationState',
     'WorkloadManager', 'MigrationManager',
+    'SqliteWorkloadManager', 'SqliteMigrationManager',
+    'InMemoryWorkloadManager', 'InMemoryMigrationManager',
     'PersistenceError', 'ObjectNotFoundError', 'DuplicateIPError'
 ]
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""JSON encoding used for storage and responses.
+
+Backed by orjson when it is installed, falling back to the standard library's
+json module otherwise. Both backends produce compact UTF-8 encoded bytes.
+"""
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+    import json
+
+
+if orjson is not None:
+    dumps = orjson.dumps
+    loads = orjson.loads
+else:  # pragma: no cover
+    def dumps(obj) -> bytes:
+        """Encode obj as compact UTF-8 JSON."""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+    
+    loads = json.loads
@@ -1,18 +1,72 @@
-from flask import Flask, request, jsonify
-from typing import Dict, Any
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import JSONProvider
+from werkzeug.routing import BaseConverter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Tuple, Type, TypeVar
+import hashlib
 import logging
+import math
+import os
+import re
+import threading
+from . import _json
 from .models import (
     Workload, Migration, MigrationTarget, Credentials, 
     Storage, MountPoint, CloudType, MigrationState
 )
-from .persistence import WorkloadManager, MigrationManager, DuplicateIPError, ObjectNotFoundError
+from .persistence import (
+    BasePersistenceManager, WorkloadManager, MigrationManager,
+    SqliteWorkloadManager, SqliteMigrationManager,
+    InMemoryWorkloadManager, InMemoryMigrationManager,
+    DuplicateIPError, ObjectNotFoundError
+)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson when it is installed."""
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return _json.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs: Any) -> Any:
+        return _json.loads(s)
+    
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(_json.dumps(obj), mimetype="application/json")
+
+
+class IPConverter(BaseConverter):
+    """URL converter matching IPv4/IPv6 address characters only."""
+    regex = r"[\d.:a-fA-F]+"
+
+
+_IP_PATTERN = re.compile(IPConverter.regex)
+
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+app.url_map.converters['ip'] = IPConverter
 logging.basicConfig(level=logging.INFO)
 
 
-workload_manager = WorkloadManager()
-migration_manager = MigrationManager()
+_storage_backend = os.environ.get("MIGRATION_STORAGE_BACKEND")
+if _storage_backend == "sqlite":
+    workload_manager = SqliteWorkloadManager()
+    migration_manager = SqliteMigrationManager()
+elif _storage_backend == "memory":
+    workload_manager = InMemoryWorkloadManager()
+    migration_manager = InMemoryMigrationManager()
+else:
+    workload_manager = WorkloadManager()
+    migration_manager = MigrationManager()
+migration_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="migration")
+_start_lock = threading.Lock()
+
+T = TypeVar('T')
+
+_LOCKED_STATES = frozenset({MigrationState.RUNNING, MigrationState.SUCCESS})
+_FINISHED_STATES = frozenset({MigrationState.SUCCESS, MigrationState.ERROR})
 
 
 def handle_error(e: Exception) -> tuple:
@@ -28,19 +82,99 @@ def handle_error(e: Exception) -> tuple:
         return jsonify({"error": "Internal server error"}), 500
 
 
+def _json_body(*required: str) -> Dict[str, Any]:
+    """Decode the request body as a JSON object and check its required top-level fields."""
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+    
+    missing = [name for name in required if name not in data]
+    if missing:
+        raise ValueError(f"Missing field: {', '.join(missing)}")
+    return data
+
+
+def _from_client(cls: Type[T], data: Any) -> T:
+    """Build a model from client-supplied data, reporting missing keys as bad input."""
+    try:
+        return cls.from_dict(data)
+    except KeyError as e:
+        raise ValueError(f"Missing field: {e.args[0]}") from None
+
+
+def _sleep_minutes(body: Dict[str, Any]) -> float:
+    """Read the simulated migration duration, rejecting anything time.sleep would."""
+    value = body.get('sleep_minutes', 0.1)
+    try:
+        minutes = float(value)
+    except TypeError:
+        raise ValueError(f"Invalid sleep_minutes: {value!r}") from None
+    if not math.isfinite(minutes) or minutes < 0:
+        raise ValueError(f"Invalid sleep_minutes: {value!r}")
+    return minutes
+
+
+def _conditional_response(etag: str, build_response: Callable[[], Response]) -> Response:
+    """Tag a response with an ETag, or answer 304 if the client already has it."""
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = build_response()
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+def _etag_response(payload: Any, etag: str) -> Response:
+    """Return payload as JSON tagged with an ETag, or 304 if the client already has it."""
+    return _conditional_response(etag, lambda: jsonify(payload))
+
+
+def _stored_response(payload: bytes) -> Response:
+    """Serve an object's stored JSON as is, tagged with a hash of it."""
+    etag = hashlib.md5(payload, usedforsecurity=False).hexdigest()
+    return _conditional_response(
+        etag, lambda: app.response_class(payload, mimetype="application/json")
+    )
+
+
+def _listing_response(manager: BasePersistenceManager,
+                      list_encoded: Callable[[], Tuple[int, List[bytes]]]) -> Response:
+    """Stream a JSON array of stored objects, passing their stored JSON through."""
+    version, payloads = list_encoded()
+    
+    def generate():
+        yield b"["
+        for i, payload in enumerate(payloads):
+            if i:
+                yield b","
+            yield payload
+        yield b"]"
+    
+    return _conditional_response(
+        f"{manager.instance_id}-{version}",
+        lambda: app.response_class(generate(), mimetype="application/json")
+    )
+
+
 @app.route('/workloads', methods=['POST'])
 def create_workload():
     """Create a new workload."""
     try:
-        data = request.get_json()
+        data = _json_body('ip', 'credentials')
         
         # Create credentials
-        creds = Credentials.from_dict(data['credentials'])
+        creds = _from_client(Credentials, data['credentials'])
         
         # Create storage with mount points
         storage = Storage()
         for mp_data in data.get('storage', {}).get('mount_points', []):
-            storage.add_mount_point(MountPoint.from_dict(mp_data))
+            storage.add_mount_point(_from_client(MountPoint, mp_data))
+        
+        if not isinstance(data['ip'], str) or not _IP_PATTERN.fullmatch(data['ip']):
+            raise ValueError(f"Invalid IP address: {data['ip']}")
         
         # Create workload
         workload = Workload(
@@ -56,12 +190,11 @@ def create_workload():
         return handle_error(e)
 
 
-@app.route('/workloads/<ip>', methods=['GET'])
+@app.route('/workloads/<ip:ip>', methods=['GET'])
 def get_workload(ip: str):
     """Get workload by IP."""
     try:
-        workload = workload_manager.read_workload(ip)
-        return jsonify(workload.to_dict())
+        return _stored_response(workload_manager.read_encoded_workload(ip))
     except Exception as e:
         return handle_error(e)
 
@@ -70,32 +203,31 @@ def get_workload(ip: str):
 def list_workloads():
     """List all workloads."""
     try:
-        workloads = workload_manager.list_all_workloads()
-        return jsonify([w.to_dict() for w in workloads])
+        return _listing_response(workload_manager, workload_manager.list_encoded_workloads)
     except Exception as e:
         return handle_error(e)
 
 
-@app.route('/workloads/<ip>', methods=['PUT'])
+@app.route('/workloads/<ip:ip>', methods=['PUT'])
 def update_workload(ip: str):
     """Update workload (IP cannot be changed)."""
     try:
 
         existing_workload = workload_manager.read_workload(ip)
         
-        data = request.get_json()
+        data = _json_body()
         
 
         if data.get('ip') and data['ip'] != ip:
             return jsonify({"error": "IP address cannot be modified"}), 400
         
         if 'credentials' in data:
-            existing_workload.credentials = Credentials.from_dict(data['credentials'])
+            existing_workload.credentials = _from_client(Credentials, data['credentials'])
         
         if 'storage' in data:
             storage = Storage()
             for mp_data in data['storage'].get('mount_points', []):
-                storage.add_mount_point(MountPoint.from_dict(mp_data))
+                storage.add_mount_point(_from_client(MountPoint, mp_data))
             existing_workload.storage = storage
         
         updated_workload = workload_manager.update_workload(existing_workload)
@@ -105,7 +237,7 @@ def update_workload(ip: str):
         return handle_error(e)
 
 
-@app.route('/workloads/<ip>', methods=['DELETE'])
+@app.route('/workloads/<ip:ip>', methods=['DELETE'])
 def delete_workload(ip: str):
     """Delete workload."""
     try:
@@ -119,13 +251,13 @@ def delete_workload(ip: str):
 def create_migration():
     """Create a new migration."""
     try:
-        data = request.get_json()
+        data = _json_body('selected_mount_points', 'source', 'migration_target')
         
-        selected_mps = [MountPoint.from_dict(mp) for mp in data['selected_mount_points']]
+        selected_mps = [_from_client(MountPoint, mp) for mp in data['selected_mount_points']]
         
-        source = Workload.from_dict(data['source'])
+        source = _from_client(Workload, data['source'])
         
-        target = MigrationTarget.from_dict(data['migration_target'])
+        target = _from_client(MigrationTarget, data['migration_target'])
         
         migration = Migration(
             selected_mount_points=selected_mps,
@@ -144,8 +276,7 @@ def create_migration():
 def get_migration(migration_id: str):
     """Get migration by ID."""
     try:
-        migration = migration_manager.read_migration(migration_id)
-        return jsonify(migration.to_dict())
+        return _stored_response(migration_manager.read_encoded_migration(migration_id))
     except Exception as e:
         return handle_error(e)
 
@@ -154,8 +285,7 @@ def get_migration(migration_id: str):
 def list_migrations():
     """List all migrations."""
     try:
-        migrations = migration_manager.list_all_migrations()
-        return jsonify([m.to_dict() for m in migrations])
+        return _listing_response(migration_manager, migration_manager.list_encoded_migrations)
     except Exception as e:
         return handle_error(e)
 
@@ -166,26 +296,17 @@ def update_migration(migration_id: str):
     try:
         existing_migration = migration_manager.read_migration(migration_id)
         
-        data = request.get_json()
+        data = _json_body()
         
-        if existing_migration.migration_state in [MigrationState.RUNNING, MigrationState.SUCCESS]:
+        if existing_migration.migration_state in _LOCKED_STATES:
             return jsonify({"error": "Cannot modify running or completed migration"}), 400
         
         if 'selected_mount_points' in data:
             existing_migration.selected_mount_points = [
-                MountPoint.from_dict(mp) for mp in data['selected_mount_points']
+                _from_client(MountPoint, mp) for mp in data['selected_mount_points']
             ]
         
-        c_drive_in_source = any(
-            mp.mount_point_name.lower() in ["c:\\", "c:/", "c:"] 
-            for mp in existing_migration.source.storage.mount_points
-        )
-        c_drive_selected = any(
-            mp.mount_point_name.lower() in ["c:\\", "c:/", "c:"]
-            for mp in existing_migration.selected_mount_points
-        )
-        
-        if c_drive_in_source and not c_drive_selected:
+        if not existing_migration.c_drive_requirement_met():
             return jsonify({"error": "C:\\ drive must be selected for migration"}), 400
         
         updated_migration = migration_manager.update_migration(existing_migration)
@@ -205,21 +326,44 @@ def delete_migration(migration_id: str):
         return handle_error(e)
 
 
+def _log_migration_failure(future: Future) -> None:
+    """Log a migration that failed on the executor; nobody else waits on it."""
+    error = future.exception()
+    if error is not None:
+        app.logger.error(f"Migration failed: {error}")
+
+
 @app.route('/migrations/<migration_id>/start', methods=['POST'])
 def start_migration(migration_id: str):
-    """Start migration execution."""
+    """Start migration execution in the background; poll /status for the outcome."""
     try:
-        migration = migration_manager.read_migration(migration_id)
+        sleep_minutes = _sleep_minutes(_json_body())
+        manager = migration_manager
         
-        if migration.migration_state == MigrationState.RUNNING:
-            return jsonify({"error": "Migration is already running"}), 400
+        response = None
         
-        sleep_minutes = request.get_json().get('sleep_minutes', 0.1) if request.get_json() else 0.1
+        def persist(migration: Migration) -> None:
+            # The first call happens before the run is submitted, so the
+            # response is snapshotted before the worker can change the migration.
+            nonlocal response
+            manager.update_migration(migration)
+            if response is None:
+                response = migration.to_dict()
         
-        migration.run(sleep_minutes)
-        updated_migration = migration_manager.update_migration(migration)
+        with _start_lock:
+            migration = manager.read_migration(migration_id)
+            
+            if migration.migration_state == MigrationState.RUNNING:
+                return jsonify({"error": "Migration is already running"}), 400
+            
+            future = migration.run(
+                sleep_minutes,
+                executor=migration_executor,
+                on_state_change=persist
+            )
         
-        return jsonify(updated_migration.to_dict())
+        future.add_done_callback(_log_migration_failure)
+        return jsonify(response), 202
     
     except Exception as e:
         return handle_error(e)
@@ -230,11 +374,12 @@ def get_migration_status(migration_id: str):
     """Get migration execution status."""
     try:
         migration = migration_manager.read_migration(migration_id)
-        return jsonify({
+        state = migration.migration_state.value
+        return _etag_response({
             "migration_id": migration_id,
-            "state": migration.migration_state.value,
-            "finished": migration.migration_state in [MigrationState.SUCCESS, MigrationState.ERROR]
-        })
+            "state": state,
+            "finished": migration.migration_state in _FINISHED_STATES
+        }, etag=f"{migration_id}-{state}")
     except Exception as e:
         return handle_error(e)
 
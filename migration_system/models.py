@@ -1,9 +1,8 @@
-import json
+import itertools
 import time
-import threading
-from copy import deepcopy
+from concurrent.futures import Executor, Future
 from enum import Enum
-from typing import List, Optional
+from typing import Callable, List, Optional, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 
@@ -16,6 +15,79 @@ class CloudType(Enum):
     VCLOUD = "vcloud"
 
 
+_C_DRIVE_ALIASES = frozenset({"c:\\", "c:/", "c:"})
+
+
+def _has_c_drive(mount_points: List['MountPoint']) -> bool:
+    """Check whether any of the mount points is the C:\\ drive."""
+    return any(mp.mount_point_name.lower() in _C_DRIVE_ALIASES for mp in mount_points)
+
+
+# How each kind of field is written out by a generated _build_dict.
+_FIELD_ENCODERS = {
+    "value": "self.{}",
+    "enum": "self.{}.value",
+    "model": "self.{}.to_dict()",
+    "models": "[item.to_dict() for item in self.{}]",
+}
+
+
+def _make_dict_builder(*fields: Tuple[str, ...]) -> Callable[[object], dict]:
+    """Compile a straight-line _build_dict for a model.
+    
+    Each field is a ``(key, kind)`` or ``(key, kind, attribute)`` tuple, where
+    kind is one of the _FIELD_ENCODERS keys. The generated function builds the
+    dict in a single literal, with no loop over the fields at call time.
+    """
+    entries = []
+    for key, kind, *attribute in fields:
+        entries.append(f"{key!r}: {_FIELD_ENCODERS[kind].format(attribute[0] if attribute else key)}")
+    source = "def _build_dict(self):\n    return {" + ", ".join(entries) + "}\n"
+    namespace: dict = {}
+    exec(source, namespace)
+    return namespace["_build_dict"]
+
+
+_ser_clock = itertools.count(1)
+
+
+class _VersionedModel:
+    """Mixin for mutable models that caches to_dict() until the object changes.
+    
+    Every attribute assignment stamps the instance with a fresh version. Models
+    fold their children's stamps into their own, so a change anywhere below a
+    model also invalidates its cached dict. The cached dict is shared between
+    callers and must be treated as read-only.
+    """
+    __slots__ = ("_ser_version", "_ser_cache")
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not hasattr(cls, "_build_dict"):
+            raise TypeError(f"{cls.__name__} must define _build_dict")
+    
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, "_ser_version", next(_ser_clock))
+        object.__setattr__(self, "_ser_cache", None)
+    
+    def _touch(self) -> None:
+        """Mark the object as changed after an in-place mutation."""
+        object.__setattr__(self, "_ser_version", next(_ser_clock))
+        object.__setattr__(self, "_ser_cache", None)
+    
+    def _ser_stamp(self) -> tuple:
+        return (self._ser_version,)
+    
+    def to_dict(self) -> dict:
+        stamp = self._ser_stamp()
+        cache = self._ser_cache
+        if cache is None or cache[0] != stamp:
+            cache = (stamp, self._build_dict())
+            object.__setattr__(self, "_ser_cache", cache)
+        return cache[1]
+
+
 class MigrationState(Enum):
     """Migration execution states."""
     NOT_STARTED = "not_started"
@@ -24,23 +96,34 @@ class MigrationState(Enum):
     SUCCESS = "success"
 
 
-@dataclass
+# Value lookups that skip Enum.__call__ on hot deserialization paths.
+_CLOUD_TYPES = {cloud_type.value: cloud_type for cloud_type in CloudType}
+_MIGRATION_STATES = {state.value: state for state in MigrationState}
+
+
+@dataclass(frozen=True, slots=True)
 class Credentials:
-    """User credentials for system access."""
+    """User credentials for system access.
+    
+    Frozen, so the serialized dict is built once and reused; treat it as read-only.
+    """
     username: str
     password: str
     domain: str
+    _cached_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    
+    _build_dict = _make_dict_builder(
+        ("username", "value"), ("password", "value"), ("domain", "value")
+    )
     
     def __post_init__(self):
         if not self.username or not self.password:
             raise ValueError("Username and password cannot be None or empty")
     
     def to_dict(self) -> dict:
-        return {
-            "username": self.username,
-            "password": self.password,
-            "domain": self.domain
-        }
+        if self._cached_dict is None:
+            object.__setattr__(self, "_cached_dict", self._build_dict())
+        return self._cached_dict
     
     @classmethod
     def from_dict(cls, data: dict) -> 'Credentials':
@@ -51,11 +134,17 @@ class Credentials:
         )
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class MountPoint:
-    """Storage mount point with size information."""
+    """Storage mount point with size information.
+    
+    Frozen, so the serialized dict is built once and reused; treat it as read-only.
+    """
     mount_point_name: str
     total_size: int
+    _cached_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    
+    _build_dict = _make_dict_builder(("mount_point_name", "value"), ("total_size", "value"))
     
     def __post_init__(self):
         if not self.mount_point_name:
@@ -64,10 +153,9 @@ class MountPoint:
             raise ValueError("Total size cannot be negative")
     
     def to_dict(self) -> dict:
-        return {
-            "mount_point_name": self.mount_point_name,
-            "total_size": self.total_size
-        }
+        if self._cached_dict is None:
+            object.__setattr__(self, "_cached_dict", self._build_dict())
+        return self._cached_dict
     
     @classmethod
     def from_dict(cls, data: dict) -> 'MountPoint':
@@ -77,23 +165,26 @@ class MountPoint:
         )
 
 
-@dataclass
-class Storage:
+@dataclass(slots=True)
+class Storage(_VersionedModel):
     """Storage container with multiple mount points."""
     mount_points: List[MountPoint] = field(default_factory=list)
     
     def add_mount_point(self, mount_point: MountPoint):
         """Add a mount point to storage."""
         self.mount_points.append(mount_point)
+        self._touch()
     
     def get_mount_point(self, name: str) -> Optional[MountPoint]:
         """Get mount point by name."""
         return next((mp for mp in self.mount_points if mp.mount_point_name == name), None)
     
-    def to_dict(self) -> dict:
-        return {
-            "mount_points": [mp.to_dict() for mp in self.mount_points]
-        }
+    def _ser_stamp(self) -> tuple:
+        # Mount points are frozen, so the items themselves tell whether the list
+        # was changed in place.
+        return (self._ser_version, tuple(self.mount_points))
+    
+    _build_dict = _make_dict_builder(("mount_points", "models"))
     
     @classmethod
     def from_dict(cls, data: dict) -> 'Storage':
@@ -102,8 +193,8 @@ class Storage:
         return storage
 
 
-@dataclass
-class Workload:
+@dataclass(slots=True)
+class Workload(_VersionedModel):
     """Workload representing a system to be migrated."""
     _ip: str
     credentials: Credentials
@@ -129,12 +220,12 @@ class Workload:
             raise ValueError("IP cannot be None or empty")
         self._ip = value
     
-    def to_dict(self) -> dict:
-        return {
-            "ip": self.ip,
-            "credentials": self.credentials.to_dict(),
-            "storage": self.storage.to_dict()
-        }
+    def _ser_stamp(self) -> tuple:
+        return (self._ser_version, self.storage._ser_stamp())
+    
+    _build_dict = _make_dict_builder(
+        ("ip", "value", "_ip"), ("credentials", "model"), ("storage", "model")
+    )
     
     @classmethod
     def from_dict(cls, data: dict) -> 'Workload':
@@ -146,8 +237,8 @@ class Workload:
         return workload
 
 
-@dataclass
-class MigrationTarget:
+@dataclass(slots=True)
+class MigrationTarget(_VersionedModel):
     """Migration target configuration."""
     cloud_type: CloudType
     cloud_credentials: Credentials
@@ -156,31 +247,35 @@ class MigrationTarget:
     def __post_init__(self):
         if not isinstance(self.cloud_type, CloudType):
             if isinstance(self.cloud_type, str):
-                try:
-                    self.cloud_type = CloudType(self.cloud_type.lower())
-                except ValueError:
+                cloud_type = _CLOUD_TYPES.get(self.cloud_type.lower())
+                if cloud_type is None:
                     raise ValueError(f"Invalid cloud type: {self.cloud_type}")
+                self.cloud_type = cloud_type
             else:
                 raise ValueError("Cloud type must be a CloudType enum value")
     
-    def to_dict(self) -> dict:
-        return {
-            "cloud_type": self.cloud_type.value,
-            "cloud_credentials": self.cloud_credentials.to_dict(),
-            "target_vm": self.target_vm.to_dict()
-        }
+    def _ser_stamp(self) -> tuple:
+        return (self._ser_version, self.target_vm._ser_stamp())
+    
+    _build_dict = _make_dict_builder(
+        ("cloud_type", "enum"), ("cloud_credentials", "model"), ("target_vm", "model")
+    )
     
     @classmethod
     def from_dict(cls, data: dict) -> 'MigrationTarget':
+        value = data["cloud_type"]
+        cloud_type = _CLOUD_TYPES.get(value) if isinstance(value, str) else None
+        if cloud_type is None:
+            raise ValueError(f"Invalid cloud type: {value}")
         return cls(
-            cloud_type=CloudType(data["cloud_type"]),
+            cloud_type=cloud_type,
             cloud_credentials=Credentials.from_dict(data["cloud_credentials"]),
             target_vm=Workload.from_dict(data["target_vm"])
         )
 
 
-@dataclass
-class Migration:
+@dataclass(slots=True)
+class Migration(_VersionedModel):
     """Migration job configuration and execution."""
     selected_mount_points: List[MountPoint]
     source: Workload
@@ -188,41 +283,53 @@ class Migration:
     migration_state: MigrationState = MigrationState.NOT_STARTED
     id: str = field(default_factory=lambda: str(int(time.time() * 1000)))
     created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    _source_has_c_drive: bool = field(default=False, init=False, repr=False, compare=False)
     
     def __post_init__(self):
-        c_drive_in_source = any(
-            mp.mount_point_name.lower() in ["c:\\", "c:/", "c:"] 
-            for mp in self.source.storage.mount_points
-        )
-        c_drive_selected = any(
-            mp.mount_point_name.lower() in ["c:\\", "c:/", "c:"]
-            for mp in self.selected_mount_points
-        )
-        
-        if c_drive_in_source and not c_drive_selected:
+        self._source_has_c_drive = _has_c_drive(self.source.storage.mount_points)
+        if not self.c_drive_requirement_met():
             raise ValueError("C:\\ drive must be selected for migration if it exists in source")
     
-    def run(self, sleep_minutes: float = 0.1) -> None:
+    def c_drive_requirement_met(self) -> bool:
+        """Check that the C:\\ drive is selected whenever the source has one."""
+        return not self._source_has_c_drive or _has_c_drive(self.selected_mount_points)
+    
+    def run(
+        self,
+        sleep_minutes: float = 0.1,
+        executor: Optional[Executor] = None,
+        on_state_change: Optional[Callable[['Migration'], None]] = None
+    ) -> Optional[Future]:
         """
         Execute the migration.
         
+        The state is switched to RUNNING before this returns. Without an executor
+        the migration then runs to completion in the calling thread; otherwise it
+        is submitted to the executor and the resulting Future is returned. If the
+        executor rejects it, the previous state is restored before re-raising.
+        
         Args:
             sleep_minutes: Duration to sleep (in minutes) to simulate migration
+            executor: Optional executor to run the migration on
+            on_state_change: Optional callback invoked with the migration after
+                every state change, e.g. to persist it
         """
         if self.migration_state == MigrationState.RUNNING:
             raise ValueError("Migration is already running")
+        previous_state = self.migration_state
+        self.migration_state = MigrationState.RUNNING
+        if on_state_change:
+            on_state_change(self)
         
         def _run_migration():
             try:
-                self.migration_state = MigrationState.RUNNING
-                
                 time.sleep(sleep_minutes * 60)
                 
                 target_storage = Storage()
                 for selected_mp in self.selected_mount_points:
                     source_mp = self.source.storage.get_mount_point(selected_mp.mount_point_name)
                     if source_mp:
-                        target_storage.add_mount_point(deepcopy(source_mp))
+                        target_storage.add_mount_point(source_mp)
                 
                 self.migration_target.target_vm.storage = target_storage
                 self.migration_state = MigrationState.SUCCESS
@@ -230,28 +337,67 @@ class Migration:
             except Exception as e:
                 self.migration_state = MigrationState.ERROR
                 raise e
+            
+            finally:
+                if on_state_change:
+                    on_state_change(self)
         
-        migration_thread = threading.Thread(target=_run_migration)
-        migration_thread.start()
-        migration_thread.join()
+        if executor is None:
+            _run_migration()
+            return None
+        try:
+            return executor.submit(_run_migration)
+        except BaseException:
+            self.migration_state = previous_state
+            if on_state_change:
+                on_state_change(self)
+            raise
     
-    def to_dict(self) -> dict:
-        return {
-            "id": self.id,
-            "selected_mount_points": [mp.to_dict() for mp in self.selected_mount_points],
-            "source": self.source.to_dict(),
-            "migration_target": self.migration_target.to_dict(),
-            "migration_state": self.migration_state.value,
-            "created_at": self.created_at
-        }
+    def _ser_stamp(self) -> tuple:
+        return (
+            self._ser_version,
+            tuple(self.selected_mount_points),
+            self.source._ser_stamp(),
+            self.migration_target._ser_stamp()
+        )
+    
+    _build_dict = _make_dict_builder(
+        ("id", "value"),
+        ("selected_mount_points", "models"),
+        ("source", "model"),
+        ("migration_target", "model"),
+        ("migration_state", "enum"),
+        ("created_at", "value")
+    )
     
     @classmethod
     def from_dict(cls, data: dict) -> 'Migration':
+        # Built in a single pass instead of through the nested from_dict chain,
+        # since this runs for every stored migration on each listing. Only used
+        # for dicts produced by to_dict, so the sub-dicts map 1:1 onto fields.
+        target_data = data["migration_target"]
+        
+        target = MigrationTarget.__new__(MigrationTarget)
+        target.cloud_type = _CLOUD_TYPES[target_data["cloud_type"]]
+        target.cloud_credentials = Credentials(**target_data["cloud_credentials"])
+        target.target_vm = _workload_from_stored(target_data["target_vm"])
+        
         migration = cls.__new__(cls)
         migration.id = data["id"]
-        migration.selected_mount_points = [MountPoint.from_dict(mp) for mp in data["selected_mount_points"]]
-        migration.source = Workload.from_dict(data["source"])
-        migration.migration_target = MigrationTarget.from_dict(data["migration_target"])
-        migration.migration_state = MigrationState(data["migration_state"])
-        migration.created_at = data.get("created_at", datetime.now().isoformat())
-        return migration
\ No newline at end of file
+        migration.selected_mount_points = [MountPoint(**mp) for mp in data["selected_mount_points"]]
+        migration.source = _workload_from_stored(data["source"])
+        migration.migration_target = target
+        migration.migration_state = _MIGRATION_STATES[data["migration_state"]]
+        migration.created_at = data.get("created_at") or datetime.now().isoformat()
+        migration._source_has_c_drive = _has_c_drive(migration.source.storage.mount_points)
+        return migration
+
+
+def _workload_from_stored(data: dict) -> Workload:
+    """Rebuild a Workload from its to_dict() form without the nested from_dict calls."""
+    workload = Workload.__new__(Workload)
+    workload._ip = data["ip"]
+    workload._ip_set = True
+    workload.credentials = Credentials(**data["credentials"])
+    workload.storage = Storage([MountPoint(**mp) for mp in data["storage"]["mount_points"]])
+    return workload
\ No newline at end of file
@@ -1,8 +1,12 @@
-import json
 import os
 import pickle
+import sqlite3
+import threading
+import uuid
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Type, TypeVar, Union
+from typing import Dict, List, Optional, Tuple, Type, TypeVar, Union
+from . import _json
 from .models import Workload, Migration, MigrationTarget
 
 T = TypeVar('T')
@@ -23,63 +27,357 @@ class DuplicateIPError(PersistenceError):
     pass
 
 
+@lru_cache(maxsize=1024)
+def _object_file_paths(storage_dir: str, object_type: str, object_id: str) -> Tuple[str, str]:
+    """Build an object's file path and its temp sibling, memoized since hot IDs are written repeatedly."""
+    file_path = os.path.join(storage_dir, f"{object_type}_{object_id}.json")
+    return file_path, file_path + ".tmp"
+
+
 class BasePersistenceManager:
-    """Base class for persistence managers."""
+    """Base class for persistence managers.
+    
+    Objects are stored as one JSON file per object. Every stored object is also
+    kept in an in-memory index per object type, as its dict together with its
+    encoded JSON. The index is loaded from storage on first use and kept
+    current on every write, so reads, listings and duplicate checks never touch
+    the disk, and listings can pass the stored JSON through without re-encoding
+    it. The index is authoritative: storage is assumed not to be written by
+    anything but this manager while it is running.
+    
+    Files hold the same compact JSON the API serves, so each write encodes an
+    object once and storage is only ever parsed when the index is first loaded.
+    A binary format would add a second encoding to every write in exchange for
+    a faster one-off load.
+    
+    Subclasses can swap the storage format by overriding the ``_load_all``,
+    ``_insert``, ``_insert_many``, ``_replace`` and ``_remove`` hooks, which
+    deal in encoded JSON.
+    """
     
-    def __init__(self, storage_dir: str = "migration_data"):
+    def __init__(self, storage_dir: str = "migration_data", durable: bool = False):
         self.storage_dir = Path(storage_dir)
+        self._storage_path = str(self.storage_dir)
+        self._init_storage()
+        self.durable = durable
+        self.instance_id = uuid.uuid4().hex[:12]
+        self._cache: Dict[str, Dict[str, Tuple[dict, bytes]]] = {}
+        self._lock = threading.RLock()
+        self._version = 0
+    
+    def _init_storage(self) -> None:
+        """Prepare the storage location; called once from __init__."""
         self.storage_dir.mkdir(exist_ok=True)
     
-    def _get_file_path(self, object_type: str, object_id: str) -> Path:
-        """Get file path for object storage."""
-        return self.storage_dir / f"{object_type}_{object_id}.json"
+    @property
+    def version(self) -> int:
+        """Counter bumped after every write, for keying caches of derived data."""
+        return self._version
+    
+    def reload(self) -> None:
+        """Drop the in-memory index so it is reloaded from storage on next use.
+        
+        Only needed after storage was changed by something other than this
+        manager. An in-memory manager has no storage to reload from, so this
+        empties it.
+        """
+        with self._lock:
+            self._cache.clear()
+            self._version += 1
+    
+    def _get_file_paths(self, object_type: str, object_id: str) -> Tuple[str, str]:
+        """Get the file path for object storage and the temp path it is written through."""
+        return _object_file_paths(self._storage_path, object_type, object_id)
+    
+    def _index(self, object_type: str) -> Dict[str, Tuple[dict, bytes]]:
+        """Get the in-memory index for an object type, loading it on first use."""
+        with self._lock:
+            index = self._cache.get(object_type)
+            if index is None:
+                index = self._cache[object_type] = {
+                    object_id: (_json.loads(payload), payload)
+                    for object_id, payload in self._load_all(object_type).items()
+                }
+            return index
+    
+    def _load_all(self, object_type: str) -> Dict[str, bytes]:
+        """Read the encoded JSON of every stored object of a type, keyed by object ID."""
+        prefix = f"{object_type}_"
+        index = {}
+        with os.scandir(self.storage_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith(prefix) and name.endswith(".json"):
+                    with open(entry.path, 'rb') as f:
+                        index[name[len(prefix):-len(".json")]] = f.read()
+        return index
+    
+    def _insert(self, object_type: str, object_id: str, payload: bytes) -> None:
+        """Store a new object; the index has already checked that its ID is free."""
+        self._write_file(*self._get_file_paths(object_type, object_id), payload)
+    
+    def _insert_many(self, object_type: str, items: Dict[str, bytes]) -> None:
+        """Store a batch of new objects whose IDs the index has already checked.
+        
+        Files are written one at a time; if one fails, those already written are
+        removed again so storage still matches the index. When durable, the
+        storage directory is flushed once for the whole batch.
+        """
+        written = []
+        try:
+            for object_id, payload in items.items():
+                file_path, tmp_path = self._get_file_paths(object_type, object_id)
+                self._write_file(file_path, tmp_path, payload, sync_dir=False)
+                written.append(file_path)
+        except BaseException:
+            for file_path in written:
+                try:
+                    os.unlink(file_path)
+                except FileNotFoundError:
+                    pass
+            raise
+        if self.durable:
+            self._fsync_dir()
+    
+    def _replace(self, object_type: str, object_id: str, payload: bytes) -> None:
+        """Overwrite a stored object."""
+        self._write_file(*self._get_file_paths(object_type, object_id), payload)
+    
+    def _remove(self, object_type: str, object_id: str) -> None:
+        """Remove an object from storage."""
+        try:
+            os.unlink(self._get_file_paths(object_type, object_id)[0])
+        except FileNotFoundError:
+            pass
+    
+    def _write_file(self, file_path: str, tmp_path: str, payload: bytes, sync_dir: bool = True) -> None:
+        """Atomically write an encoded object to disk.
+        
+        The payload goes to a sibling temp file with raw write() calls, normally
+        a single one, and is renamed over the target, so readers never see a
+        partially written file, and the temp file is removed if the write fails.
+        Files hold credentials, so they are created readable by the owner only.
+        They are only fsynced when the manager is durable; batch writers pass
+        ``sync_dir=False`` and flush the directory once themselves.
+        """
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            try:
+                view = memoryview(payload)
+                while view:
+                    view = view[os.write(fd, view):]
+                if self.durable:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        if self.durable and sync_dir:
+            self._fsync_dir()
+    
+    def _fsync_dir(self) -> None:
+        """Flush the storage directory entry so renames survive a crash."""
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        dir_fd = os.open(self.storage_dir, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
     
     def create(self, obj: T, object_id: str, object_type: str) -> T:
         """Create a new object."""
-        file_path = self._get_file_path(object_type, object_id)
-        if file_path.exists():
-            raise PersistenceError(f"Object {object_id} already exists")
-        
-        with open(file_path, 'w') as f:
-            json.dump(obj.to_dict(), f, indent=2)
+        with self._lock:
+            index = self._index(object_type)
+            if object_id in index:
+                raise PersistenceError(f"Object {object_id} already exists")
+            
+            data = obj.to_dict()
+            payload = _json.dumps(data)
+            self._insert(object_type, object_id, payload)
+            index[object_id] = (data, payload)
+            self._version += 1
         return obj
     
+    def create_many(self, objects: List[Tuple[T, str]], object_type: str) -> List[T]:
+        """Create a batch of new objects, given as ``(object, object_id)`` pairs.
+        
+        The whole batch is rejected before anything is written if any ID is
+        already stored or repeated within the batch.
+        """
+        with self._lock:
+            index = self._index(object_type)
+            entries: Dict[str, Tuple[dict, bytes]] = {}
+            for obj, object_id in objects:
+                if object_id in index or object_id in entries:
+                    raise PersistenceError(f"Object {object_id} already exists")
+                data = obj.to_dict()
+                entries[object_id] = (data, _json.dumps(data))
+            
+            self._insert_many(
+                object_type, {object_id: payload for object_id, (_, payload) in entries.items()}
+            )
+            index.update(entries)
+            self._version += 1
+        return [obj for obj, _ in objects]
+    
     def read(self, object_id: str, object_type: str, cls: Type[T]) -> T:
         """Read an object by ID."""
-        file_path = self._get_file_path(object_type, object_id)
-        if not file_path.exists():
+        with self._lock:
+            entry = self._index(object_type).get(object_id)
+        if entry is None:
             raise ObjectNotFoundError(f"Object {object_id} not found")
-        
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        return cls.from_dict(data)
+        return cls.from_dict(entry[0])
     
-    def update(self, obj: T, object_id: str, object_type: str) -> T:
-        """Update an existing object."""
-        file_path = self._get_file_path(object_type, object_id)
-        if not file_path.exists():
+    def read_encoded(self, object_id: str, object_type: str) -> bytes:
+        """Read an object's stored JSON without rebuilding the object."""
+        with self._lock:
+            entry = self._index(object_type).get(object_id)
+        if entry is None:
             raise ObjectNotFoundError(f"Object {object_id} not found")
-        
-        with open(file_path, 'w') as f:
-            json.dump(obj.to_dict(), f, indent=2)
-        return obj
+        return entry[1]
+    
+    def update(self, obj: T, object_id: str, object_type: str) -> T:
+        """Update an existing object and return a fresh copy rebuilt from what was stored."""
+        with self._lock:
+            index = self._index(object_type)
+            if object_id not in index:
+                raise ObjectNotFoundError(f"Object {object_id} not found")
+            
+            data = obj.to_dict()
+            payload = _json.dumps(data)
+            self._replace(object_type, object_id, payload)
+            index[object_id] = (data, payload)
+            self._version += 1
+        return type(obj).from_dict(data)
     
     def delete(self, object_id: str, object_type: str) -> None:
         """Delete an object by ID."""
-        file_path = self._get_file_path(object_type, object_id)
-        if not file_path.exists():
-            raise ObjectNotFoundError(f"Object {object_id} not found")
-        file_path.unlink()
+        with self._lock:
+            index = self._index(object_type)
+            if object_id not in index:
+                raise ObjectNotFoundError(f"Object {object_id} not found")
+            self._remove(object_type, object_id)
+            del index[object_id]
+            self._version += 1
     
     def list_all(self, object_type: str, cls: Type[T]) -> List[T]:
         """List all objects of a specific type."""
-        pattern = f"{object_type}_*.json"
-        objects = []
-        for file_path in self.storage_dir.glob(pattern):
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-            objects.append(cls.from_dict(data))
-        return objects
+        with self._lock:
+            snapshot = list(self._index(object_type).values())
+        return [cls.from_dict(data) for data, _ in snapshot]
+    
+    def list_encoded(self, object_type: str) -> Tuple[int, List[bytes]]:
+        """Snapshot the stored JSON of all objects of a type, with the version it reflects."""
+        with self._lock:
+            return self._version, [payload for _, payload in self._index(object_type).values()]
+
+
+class SqlitePersistenceManager(BasePersistenceManager):
+    """Persistence manager storing objects as rows of a single SQLite database.
+    
+    Each object type gets its own ``<object_type>s`` table keyed by object ID,
+    so uniqueness is enforced by the primary key and listing is one query. The
+    database file is memory-mapped, so loading the index reads pages straight
+    from the page cache instead of copying them through read() calls.
+    """
+    
+    DB_FILENAME = "migration_system.db"
+    MMAP_SIZE = 1 << 30
+    
+    def __init__(self, storage_dir: str = "migration_data", durable: bool = False):
+        Path(storage_dir).mkdir(exist_ok=True)
+        self._db = sqlite3.connect(
+            str(Path(storage_dir) / self.DB_FILENAME),
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f"PRAGMA mmap_size={self.MMAP_SIZE}")
+        self._db.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+        self._tables: set = set()
+        super().__init__(storage_dir, durable)
+    
+    def _table(self, object_type: str) -> str:
+        """Get the table name for an object type, creating the table on first use."""
+        table = f"{object_type}s"
+        if table not in self._tables:
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, data BLOB NOT NULL)"
+            )
+            self._tables.add(table)
+        return table
+    
+    def _load_all(self, object_type: str) -> Dict[str, bytes]:
+        rows = self._db.execute(f"SELECT id, data FROM {self._table(object_type)}")
+        return {object_id: bytes(data) for object_id, data in rows}
+    
+    def _insert(self, object_type: str, object_id: str, payload: bytes) -> None:
+        try:
+            self._db.execute(
+                f"INSERT INTO {self._table(object_type)} (id, data) VALUES (?, ?)",
+                (object_id, payload)
+            )
+        except sqlite3.IntegrityError:
+            raise PersistenceError(f"Object {object_id} already exists")
+    
+    def _insert_many(self, object_type: str, items: Dict[str, bytes]) -> None:
+        table = self._table(object_type)
+        self._db.execute("BEGIN")
+        try:
+            self._db.executemany(f"INSERT INTO {table} (id, data) VALUES (?, ?)", items.items())
+        except sqlite3.IntegrityError as e:
+            self._db.execute("ROLLBACK")
+            raise PersistenceError(f"Object already exists: {e}")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+    
+    def _replace(self, object_type: str, object_id: str, payload: bytes) -> None:
+        self._db.execute(
+            f"UPDATE {self._table(object_type)} SET data = ? WHERE id = ?",
+            (payload, object_id)
+        )
+    
+    def _remove(self, object_type: str, object_id: str) -> None:
+        self._db.execute(f"DELETE FROM {self._table(object_type)} WHERE id = ?", (object_id,))
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+
+class InMemoryPersistenceManager(BasePersistenceManager):
+    """Persistence manager that keeps objects only in its in-memory index.
+    
+    Nothing is written to storage, so objects live as long as the manager does.
+    Useful for tests and throwaway runs that only need the CRUD semantics.
+    """
+    
+    def _init_storage(self) -> None:
+        pass
+    
+    def _load_all(self, object_type: str) -> Dict[str, bytes]:
+        return {}
+    
+    def _insert(self, object_type: str, object_id: str, payload: bytes) -> None:
+        pass
+    
+    def _insert_many(self, object_type: str, items: Dict[str, bytes]) -> None:
+        pass
+    
+    def _replace(self, object_type: str, object_id: str, payload: bytes) -> None:
+        pass
+    
+    def _remove(self, object_type: str, object_id: str) -> None:
+        pass
 
 
 class WorkloadManager(BasePersistenceManager):
@@ -87,17 +385,26 @@ class WorkloadManager(BasePersistenceManager):
     
     def create_workload(self, workload: Workload) -> Workload:
         """Create a new workload, ensuring IP uniqueness."""
-        existing_workloads = self.list_all_workloads()
-        for existing in existing_workloads:
-            if existing.ip == workload.ip:
+        with self._lock:
+            if workload.ip in self._index("workload"):
                 raise DuplicateIPError(f"Workload with IP {workload.ip} already exists")
-        
-        return self.create(workload, workload.ip, "workload")
+            return self.create(workload, workload.ip, "workload")
+    
+    def create_workloads(self, workloads: List[Workload]) -> List[Workload]:
+        """Create a batch of workloads, rejecting all of them if any IP is taken."""
+        try:
+            return self.create_many([(w, w.ip) for w in workloads], "workload")
+        except PersistenceError as e:
+            raise DuplicateIPError(str(e)) from e
     
     def read_workload(self, ip: str) -> Workload:
         """Read workload by IP address."""
         return self.read(ip, "workload", Workload)
     
+    def read_encoded_workload(self, ip: str) -> bytes:
+        """Read a workload's stored JSON by IP address."""
+        return self.read_encoded(ip, "workload")
+    
     def update_workload(self, workload: Workload) -> Workload:
         """Update existing workload."""
         return self.update(workload, workload.ip, "workload")
@@ -109,6 +416,10 @@ class WorkloadManager(BasePersistenceManager):
     def list_all_workloads(self) -> List[Workload]:
         """List all workloads."""
         return self.list_all("workload", Workload)
+    
+    def list_encoded_workloads(self) -> Tuple[int, List[bytes]]:
+        """Snapshot the stored JSON of all workloads, with the manager version."""
+        return self.list_encoded("workload")
 
 
 class MigrationManager(BasePersistenceManager):
@@ -118,10 +429,18 @@ class MigrationManager(BasePersistenceManager):
         """Create a new migration."""
         return self.create(migration, migration.id, "migration")
     
+    def create_migrations(self, migrations: List[Migration]) -> List[Migration]:
+        """Create a batch of migrations in one write."""
+        return self.create_many([(m, m.id) for m in migrations], "migration")
+    
     def read_migration(self, migration_id: str) -> Migration:
         """Read migration by ID."""
         return self.read(migration_id, "migration", Migration)
     
+    def read_encoded_migration(self, migration_id: str) -> bytes:
+        """Read a migration's stored JSON by ID."""
+        return self.read_encoded(migration_id, "migration")
+    
     def update_migration(self, migration: Migration) -> Migration:
         """Update existing migration."""
         return self.update(migration, migration.id, "migration")
@@ -133,3 +452,27 @@ class MigrationManager(BasePersistenceManager):
     def list_all_migrations(self) -> List[Migration]:
         """List all migrations."""
         return self.list_all("migration", Migration)
+    
+    def list_encoded_migrations(self) -> Tuple[int, List[bytes]]:
+        """Snapshot the stored JSON of all migrations, with the manager version."""
+        return self.list_encoded("migration")
+
+
+class SqliteWorkloadManager(SqlitePersistenceManager, WorkloadManager):
+    """Workload manager backed by SQLite."""
+    pass
+
+
+class SqliteMigrationManager(SqlitePersistenceManager, MigrationManager):
+    """Migration manager backed by SQLite."""
+    pass
+
+
+class InMemoryWorkloadManager(InMemoryPersistenceManager, WorkloadManager):
+    """Workload manager that keeps workloads in memory only."""
+    pass
+
+
+class InMemoryMigrationManager(InMemoryPersistenceManager, MigrationManager):
+    """Migration manager that keeps migrations in memory only."""
+    pass
@@ -0,0 +1,32 @@
+import pytest
+from migration_system.models import MountPoint, Storage
+from .fixtures.models import DEFAULT_CREDS, CLOUD_CREDS
+
+
+# Credentials and MountPoint are frozen, so one instance can serve the whole session.
+@pytest.fixture(scope="session")
+def creds():
+    return DEFAULT_CREDS
+
+
+@pytest.fixture(scope="session")
+def cloud_creds():
+    return CLOUD_CREDS
+
+
+@pytest.fixture(scope="session")
+def c_drive():
+    return MountPoint("C:\\", 1000)
+
+
+@pytest.fixture(scope="session")
+def d_drive():
+    return MountPoint("D:\\", 2000)
+
+
+@pytest.fixture
+def fresh_source_storage(c_drive, d_drive):
+    storage = Storage()
+    storage.add_mount_point(c_drive)
+    storage.add_mount_point(d_drive)
+    return storage
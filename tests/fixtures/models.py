@@ -0,0 +1,6 @@
+"""Shared model instances for tests. Credentials are frozen, so one instance serves every test."""
+from migration_system.models import Credentials
+
+DEFAULT_CREDS = Credentials("user", "pass", "domain.com")
+CLOUD_CREDS = Credentials("cloud_user", "cloud_pass", "cloud.com")
+UPDATED_CREDS = Credentials("user2", "pass2", "domain2.com")
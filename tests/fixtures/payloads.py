@@ -0,0 +1,66 @@
+"""Sample request bodies shared by the API tests and the harness. Copy before mutating."""
+
+WORKLOAD = {
+    "ip": "192.168.1.1",
+    "credentials": {
+        "username": "testuser",
+        "password": "testpass",
+        "domain": "testdomain.com"
+    },
+    "storage": {
+        "mount_points": [
+            {
+                "mount_point_name": "C:\\",
+                "total_size": 1000
+            },
+            {
+                "mount_point_name": "D:\\",
+                "total_size": 2000
+            }
+        ]
+    }
+}
+
+MIGRATION = {
+    "selected_mount_points": [
+        {
+            "mount_point_name": "C:\\",
+            "total_size": 1000
+        }
+    ],
+    "source": {
+        "ip": "192.168.1.1",
+        "credentials": {
+            "username": "testuser",
+            "password": "testpass",
+            "domain": "testdomain.com"
+        },
+        "storage": {
+            "mount_points": [
+                {
+                    "mount_point_name": "C:\\",
+                    "total_size": 1000
+                }
+            ]
+        }
+    },
+    "migration_target": {
+        "cloud_type": "aws",
+        "cloud_credentials": {
+            "username": "clouduser",
+            "password": "cloudpass",
+            "domain": "cloud.com"
+        },
+        "target_vm": {
+            "ip": "192.168.1.100",
+            "credentials": {
+                "username": "targetuser",
+                "password": "targetpass",
+                "domain": "target.com"
+            },
+            "storage": {
+                "mount_points": []
+            }
+        }
+    }
+}
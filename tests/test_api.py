@@ -1,214 +1,217 @@
 import pytest
+import copy
 import json
-import tempfile
-import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from migration_system import api
 from migration_system.api import app
+from migration_system.persistence import InMemoryWorkloadManager, InMemoryMigrationManager
 from migration_system.models import CloudType, MigrationState
+from .fixtures.payloads import WORKLOAD, MIGRATION
 
 
-@pytest.fixture
-def client():
-    temp_dir = tempfile.mkdtemp()
+@pytest.fixture(scope="session")
+def _app():
     app.config['TESTING'] = True
-    app.config['DATA_DIR'] = temp_dir
-
-    from migration_system.persistence import WorkloadManager, MigrationManager
-    from migration_system import api
-    api.workload_manager = WorkloadManager(temp_dir)
-    api.migration_manager = MigrationManager(temp_dir)
 
     with app.test_client() as client:
         yield client
 
-    shutil.rmtree(temp_dir)
+
+@pytest.fixture
+def client(_app):
+    # The API tests check HTTP behaviour only, so storage stays in memory;
+    # the file and SQLite backends are covered by test_persistence.py.
+    api.workload_manager = InMemoryWorkloadManager()
+    api.migration_manager = InMemoryMigrationManager()
+
+    return _app
+
+
+def wait_for_migration(client, migration_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(f'/migrations/{migration_id}/status').get_json()
+        if status['finished'] or time.monotonic() > deadline:
+            return status
+        time.sleep(0.01)
+
+
+# Bodies for tests that post the samples unchanged, serialized once at import.
+_WORKLOAD_BYTES = json.dumps(WORKLOAD).encode()
+_MIGRATION_BYTES = json.dumps(MIGRATION).encode()
+
+
+def _workload(ip=WORKLOAD["ip"], **overrides):
+    """Build a fresh workload body that differs from the sample only in the given fields."""
+    body = copy.deepcopy(WORKLOAD)
+    body["ip"] = ip
+    body.update(overrides)
+    return body
 
 
 @pytest.fixture
 def sample_workload_data():
-    return {
-        "ip": "192.168.1.1",
-        "credentials": {
-            "username": "testuser",
-            "password": "testpass",
-            "domain": "testdomain.com"
-        },
-        "storage": {
-            "mount_points": [
-                {
-                    "mount_point_name": "C:\\",
-                    "total_size": 1000
-                },
-                {
-                    "mount_point_name": "D:\\",
-                    "total_size": 2000
-                }
-            ]
-        }
-    }
+    return _workload()
+
+
+@pytest.fixture
+def created_workload(client, sample_workload_data):
+    client.post('/workloads', json=sample_workload_data)
+    return sample_workload_data
 
 
 @pytest.fixture
 def sample_migration_data():
-    return {
-        "selected_mount_points": [
-            {
-                "mount_point_name": "C:\\",
-                "total_size": 1000
-            }
-        ],
-        "source": {
-            "ip": "192.168.1.1",
-            "credentials": {
-                "username": "testuser",
-                "password": "testpass",
-                "domain": "testdomain.com"
-            },
-            "storage": {
-                "mount_points": [
-                    {
-                        "mount_point_name": "C:\\",
-                        "total_size": 1000
-                    }
-                ]
-            }
-        },
-        "migration_target": {
-            "cloud_type": "aws",
-            "cloud_credentials": {
-                "username": "clouduser",
-                "password": "cloudpass",
-                "domain": "cloud.com"
-            },
-            "target_vm": {
-                "ip": "192.168.1.100",
-                "credentials": {
-                    "username": "targetuser",
-                    "password": "targetpass",
-                    "domain": "target.com"
-                },
-                "storage": {
-                    "mount_points": []
-                }
-            }
-        }
-    }
+    return copy.deepcopy(MIGRATION)
 
 
 class TestWorkloadAPI:
-    def test_create_workload(self, client, sample_workload_data):
+    def test_create_workload(self, client):
         response = client.post('/workloads', 
-                              data=json.dumps(sample_workload_data),
+                              data=_WORKLOAD_BYTES,
                               content_type='application/json')
         
         assert response.status_code == 201
-        data = json.loads(response.data)
-        assert data['ip'] == sample_workload_data['ip']
+        data = response.get_json()
+        assert data['ip'] == WORKLOAD['ip']
     
-    def test_create_duplicate_workload(self, client, sample_workload_data):
+    def test_create_duplicate_workload(self, client):
 
         client.post('/workloads', 
-                   data=json.dumps(sample_workload_data),
+                   data=_WORKLOAD_BYTES,
                    content_type='application/json')
         
 
         response = client.post('/workloads', 
-                              data=json.dumps(sample_workload_data),
+                              data=_WORKLOAD_BYTES,
                               content_type='application/json')
         
         assert response.status_code == 409
     
-    def test_get_workload(self, client, sample_workload_data):
-
-        client.post('/workloads', 
-                   data=json.dumps(sample_workload_data),
-                   content_type='application/json')
+    def test_create_workload_missing_fields(self, client):
+        response = client.post('/workloads', data='not json', content_type='text/plain')
         
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Missing field: ip, credentials'
+    
+    def test_create_workload_missing_nested_field(self, client, monkeypatch):
+        response = client.post('/workloads', json=_workload(credentials={"username": "testuser"}))
+
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Missing field: password'
+
+        def broken_create(workload):
+            raise KeyError("aws")
+
+        monkeypatch.setattr(api.workload_manager, "create_workload", broken_create)
+        assert client.post('/workloads', json=_workload()).status_code == 500
 
-        response = client.get(f'/workloads/{sample_workload_data["ip"]}')
+    def test_create_workload_non_object_body(self, client):
+        response = client.post('/workloads', json=["192.168.1.1"])
         
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert data['ip'] == sample_workload_data['ip']
+        assert response.status_code == 400
+    
+    def test_create_workload_invalid_ip(self, client):
+        response = client.post('/workloads', json=_workload(ip='../192.168.1.1'))
+        
+        assert response.status_code == 400
+        assert client.post('/workloads', json=_workload(ip=12345)).status_code == 400
+        assert client.get('/workloads/not-an-ip').status_code == 404
+    
+    def test_get_workload_not_modified(self, client, created_workload):
+        response = client.get(f'/workloads/{WORKLOAD["ip"]}')
+        etag = response.headers['ETag']
+        
+        response = client.get(f'/workloads/{WORKLOAD["ip"]}',
+                              headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        assert response.headers['ETag'] == etag
     
     def test_get_nonexistent_workload(self, client):
         response = client.get('/workloads/192.168.1.99')
         assert response.status_code == 404
     
-    def test_update_workload(self, client, sample_workload_data):
-        client.post('/workloads', 
-                   data=json.dumps(sample_workload_data),
-                   content_type='application/json')
-        update_data = sample_workload_data.copy()
-        update_data['credentials']['username'] = 'updateduser'
+    @pytest.mark.parametrize("method,update,expected_status,expected_username,status_after", [
+        ("get", None, 200, "testuser", 200),
+        ("put", {"credentials": {"username": "updateduser", "password": "testpass",
+                                 "domain": "testdomain.com"}}, 200, "updateduser", 200),
+        ("put", {"ip": "192.168.1.2"}, 400, None, 200),
+        ("delete", None, 204, None, 404),
+    ])
+    def test_workload_crud(self, client, created_workload, method, update,
+                           expected_status, expected_username, status_after):
+        path = f'/workloads/{created_workload["ip"]}'
+        kwargs = {}
+        if update is not None:
+            kwargs = {"json": update}
         
-        response = client.put(f'/workloads/{sample_workload_data["ip"]}',
-                             data=json.dumps(update_data),
-                             content_type='application/json')
+        response = getattr(client, method)(path, **kwargs)
         
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert data['credentials']['username'] == 'updateduser'
+        assert response.status_code == expected_status
+        if expected_username is not None:
+            data = response.get_json()
+            assert data['ip'] == created_workload['ip']
+            assert data['credentials']['username'] == expected_username
+        assert client.get(path).status_code == status_after
     
-    def test_update_workload_ip_forbidden(self, client, sample_workload_data):
-  
-        client.post('/workloads', 
-                   data=json.dumps(sample_workload_data),
-                   content_type='application/json')
-        
-     
-        update_data = sample_workload_data.copy()
-        update_data['ip'] = '192.168.1.2'
+    def test_list_workloads(self, client):
+        client.post('/workloads', data=_WORKLOAD_BYTES, content_type='application/json')
+        client.post('/workloads', json=_workload(ip='192.168.1.2'))
         
-        response = client.put(f'/workloads/{sample_workload_data["ip"]}',
-                             data=json.dumps(update_data),
-                             content_type='application/json')
-        
-        assert response.status_code == 400
-    
-    def test_delete_workload(self, client, sample_workload_data):
 
-        client.post('/workloads', 
-                   data=json.dumps(sample_workload_data),
-                   content_type='application/json')
-        
-       
-        response = client.delete(f'/workloads/{sample_workload_data["ip"]}')
-        assert response.status_code == 204
+        response = client.get('/workloads')
+        assert response.status_code == 200
         
+        data = response.get_json()
+        assert len(data) == 2
     
-        response = client.get(f'/workloads/{sample_workload_data["ip"]}')
-        assert response.status_code == 404
-    
-    def test_list_workloads(self, client, sample_workload_data):
-
-        workload2 = sample_workload_data.copy()
-        workload2['ip'] = '192.168.1.2'
+    def test_list_workloads_tracks_writes(self, client):
+        response = client.get('/workloads')
+        assert response.get_json() == []
+        etag = response.headers['ETag']
+        
+        response = client.get('/workloads', headers={'If-None-Match': etag})
+        assert response.status_code == 304
         
         client.post('/workloads', 
-                   data=json.dumps(sample_workload_data),
-                   content_type='application/json')
-        client.post('/workloads', 
-                   data=json.dumps(workload2),
+                   data=_WORKLOAD_BYTES,
                    content_type='application/json')
         
-
-        response = client.get('/workloads')
+        response = client.get('/workloads', headers={'If-None-Match': etag})
         assert response.status_code == 200
-        
-        data = json.loads(response.data)
-        assert len(data) == 2
+        assert [w['ip'] for w in response.get_json()] == [WORKLOAD['ip']]
 
 
 class TestMigrationAPI:
-    def test_create_migration(self, client, sample_migration_data):
+    def test_create_migration(self, client):
         response = client.post('/migrations',
-                              data=json.dumps(sample_migration_data),
+                              data=_MIGRATION_BYTES,
                               content_type='application/json')
         
         assert response.status_code == 201
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['migration_state'] == 'not_started'
     
+    def test_list_migrations(self, client):
+        response = client.post('/migrations',
+                              data=_MIGRATION_BYTES,
+                              content_type='application/json')
+        created = response.get_json()
+        
+        response = client.get('/migrations')
+        assert response.status_code == 200
+        assert response.get_json() == [created]
+    
+    @pytest.mark.parametrize("cloud_type", ["AWS", "Aws", "gcp", ["aws"]])
+    def test_create_migration_invalid_cloud_type(self, client, sample_migration_data, cloud_type):
+        sample_migration_data['migration_target']['cloud_type'] = cloud_type
+
+        response = client.post('/migrations', json=sample_migration_data)
+
+        assert response.status_code == 400
+
     def test_create_migration_without_c_drive(self, client, sample_migration_data):
 
         sample_migration_data['selected_mount_points'] = [
@@ -218,43 +221,123 @@ class TestMigrationAPI:
             }
         ]
         
+        response = client.post('/migrations', json=sample_migration_data)
+        
+        assert response.status_code == 400
+    
+    def test_update_migration_requires_c_drive(self, client):
         response = client.post('/migrations',
-                              data=json.dumps(sample_migration_data),
+                              data=_MIGRATION_BYTES,
                               content_type='application/json')
+        migration_id = response.get_json()['id']
+        
+        update_data = {"selected_mount_points": [{"mount_point_name": "D:\\", "total_size": 2000}]}
+        response = client.put(f'/migrations/{migration_id}', json=update_data)
         
         assert response.status_code == 400
     
-    def test_start_migration(self, client, sample_migration_data):
+    def test_start_migration(self, client):
 
         response = client.post('/migrations',
-                              data=json.dumps(sample_migration_data),
+                              data=_MIGRATION_BYTES,
                               content_type='application/json')
         
-        migration_data = json.loads(response.data)
+        migration_data = response.get_json()
         migration_id = migration_data['id']
         
       
         start_data = {"sleep_minutes": 0.001}  
-        response = client.post(f'/migrations/{migration_id}/start',
-                              data=json.dumps(start_data),
-                              content_type='application/json')
+        response = client.post(f'/migrations/{migration_id}/start', json=start_data)
         
-        assert response.status_code == 200
-        data = json.loads(response.data)
+        assert response.status_code == 202
+        data = response.get_json()
+        assert data['migration_state'] == 'running'
+        
+        status = wait_for_migration(client, migration_id)
+        assert status['state'] == 'success'
+        
+        response = client.get(f'/migrations/{migration_id}')
+        data = response.get_json()
         assert data['migration_state'] == 'success'
+        assert data['migration_target']['target_vm']['storage']['mount_points'] == [
+            {"mount_point_name": "C:\\", "total_size": 1000}
+        ]
     
-    def test_get_migration_status(self, client, sample_migration_data):
+    def test_start_running_migration(self, client):
+        response = client.post('/migrations',
+                              data=_MIGRATION_BYTES,
+                              content_type='application/json')
+        migration_id = response.get_json()['id']
+        
+        start_data = {"sleep_minutes": 0.01}
+        client.post(f'/migrations/{migration_id}/start', json=start_data)
+        response = client.post(f'/migrations/{migration_id}/start', json=start_data)
+        
+        assert response.status_code == 400
+        wait_for_migration(client, migration_id)
+
+    def test_start_migration_rejected_by_executor(self, client, monkeypatch):
+        response = client.post('/migrations',
+                              data=_MIGRATION_BYTES,
+                              content_type='application/json')
+        migration_id = response.get_json()['id']
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        executor.shutdown()
+        monkeypatch.setattr(api, "migration_executor", executor)
+        response = client.post(f'/migrations/{migration_id}/start', json={"sleep_minutes": 0.001})
+
+        assert response.status_code == 500
+        status = client.get(f'/migrations/{migration_id}/status').get_json()
+        assert status['state'] == 'not_started'
+
+    @pytest.mark.parametrize("sleep_minutes", [None, [1], "abc", "nan", "inf", -1])
+    def test_start_migration_invalid_sleep_minutes(self, client, sleep_minutes):
+        response = client.post('/migrations',
+                              data=_MIGRATION_BYTES,
+                              content_type='application/json')
+        migration_id = response.get_json()['id']
+
+        response = client.post(f'/migrations/{migration_id}/start',
+                               json={"sleep_minutes": sleep_minutes})
+
+        assert response.status_code == 400
+        status = client.get(f'/migrations/{migration_id}/status').get_json()
+        assert status['state'] == 'not_started'
+
+    def test_get_migration_status(self, client):
 
         response = client.post('/migrations',
-                              data=json.dumps(sample_migration_data),
+                              data=_MIGRATION_BYTES,
                               content_type='application/json')
         
-        migration_data = json.loads(response.data)
+        migration_data = response.get_json()
         migration_id = migration_data['id']
         response = client.get(f'/migrations/{migration_id}/status')
         assert response.status_code == 200
         
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['migration_id'] == migration_id
         assert data['state'] == 'not_started'
         assert data['finished'] == False
+    
+    def test_migration_status_etag_tracks_state(self, client):
+        response = client.post('/migrations',
+                              data=_MIGRATION_BYTES,
+                              content_type='application/json')
+        migration_id = response.get_json()['id']
+        
+        response = client.get(f'/migrations/{migration_id}/status')
+        etag = response.headers['ETag']
+        
+        response = client.get(f'/migrations/{migration_id}/status',
+                              headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        
+        client.post(f'/migrations/{migration_id}/start', json={"sleep_minutes": 0.001})
+        wait_for_migration(client, migration_id)
+        
+        response = client.get(f'/migrations/{migration_id}/status',
+                              headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.get_json()['state'] == 'success'
@@ -1,66 +1,53 @@
-import requests
+import copy
 import json
+import tempfile
 import time
 import sys
+from migration_system import api
+from migration_system.persistence import WorkloadManager, MigrationManager
+from .fixtures.payloads import WORKLOAD, MIGRATION
 
 
 class APITestHarness:
-    def __init__(self, base_url="http://localhost:5000"):
-        self.base_url = base_url
-        self.session = requests.Session()
+    def __init__(self, data_dir=None):
+        if data_dir is not None:
+            api.workload_manager = WorkloadManager(data_dir)
+            api.migration_manager = MigrationManager(data_dir)
+        self.client = api.app.test_client()
     
     def test_workload_crud(self):
         """Test workload CRUD operations."""
         print("Testing Workload CRUD operations...")
         
 
-        workload_data = {
-            "ip": "192.168.1.1",
-            "credentials": {
-                "username": "testuser",
-                "password": "testpass",
-                "domain": "testdomain.com"
-            },
-            "storage": {
-                "mount_points": [
-                    {
-                        "mount_point_name": "C:\\",
-                        "total_size": 1000
-                    },
-                    {
-                        "mount_point_name": "D:\\",
-                        "total_size": 2000
-                    }
-                ]
-            }
-        }
+        workload_data = copy.deepcopy(WORKLOAD)
         
 
-        response = self.session.post(f"{self.base_url}/workloads", json=workload_data)
-        assert response.status_code == 201, f"Create failed: {response.text}"
+        response = self.client.post("/workloads", json=workload_data)
+        assert response.status_code == 201, f"Create failed: {response.get_data(as_text=True)}"
         print("✓ Workload created successfully")
         
 
-        response = self.session.get(f"{self.base_url}/workloads/192.168.1.1")
-        assert response.status_code == 200, f"Get failed: {response.text}"
+        response = self.client.get("/workloads/192.168.1.1")
+        assert response.status_code == 200, f"Get failed: {response.get_data(as_text=True)}"
         print("✓ Workload retrieved successfully")
         
 
         workload_data['credentials']['username'] = 'updateduser'
-        response = self.session.put(f"{self.base_url}/workloads/192.168.1.1", json=workload_data)
-        assert response.status_code == 200, f"Update failed: {response.text}"
+        response = self.client.put("/workloads/192.168.1.1", json=workload_data)
+        assert response.status_code == 200, f"Update failed: {response.get_data(as_text=True)}"
         print("✓ Workload updated successfully")
         
   
         workload_data['ip'] = '192.168.1.2'
-        response = self.session.put(f"{self.base_url}/workloads/192.168.1.1", json=workload_data)
-        assert response.status_code == 400, f"IP update should fail: {response.text}"
+        response = self.client.put("/workloads/192.168.1.1", json=workload_data)
+        assert response.status_code == 400, f"IP update should fail: {response.get_data(as_text=True)}"
         print("✓ IP update correctly rejected")
         
    
-        response = self.session.get(f"{self.base_url}/workloads")
-        assert response.status_code == 200, f"List failed: {response.text}"
-        workloads = response.json()
+        response = self.client.get("/workloads")
+        assert response.status_code == 200, f"List failed: {response.get_data(as_text=True)}"
+        workloads = response.get_json()
         assert len(workloads) >= 1, "Should have at least one workload"
         print("✓ Workloads listed successfully")
     
@@ -69,82 +56,43 @@ class APITestHarness:
         print("\nTesting Migration operations...")
         
 
-        migration_data = {
-            "selected_mount_points": [
-                {
-                    "mount_point_name": "C:\\",
-                    "total_size": 1000
-                }
-            ],
-            "source": {
-                "ip": "192.168.1.1",
-                "credentials": {
-                    "username": "testuser",
-                    "password": "testpass",
-                    "domain": "testdomain.com"
-                },
-                "storage": {
-                    "mount_points": [
-                        {
-                            "mount_point_name": "C:\\",
-                            "total_size": 1000
-                        }
-                    ]
-                }
-            },
-            "migration_target": {
-                "cloud_type": "aws",
-                "cloud_credentials": {
-                    "username": "clouduser",
-                    "password": "cloudpass",
-                    "domain": "cloud.com"
-                },
-                "target_vm": {
-                    "ip": "192.168.1.100",
-                    "credentials": {
-                        "username": "targetuser",
-                        "password": "targetpass",
-                        "domain": "target.com"
-                    },
-                    "storage": {
-                        "mount_points": []
-                    }
-                }
-            }
-        }
+        migration_data = copy.deepcopy(MIGRATION)
         
-=
-        response = self.session.post(f"{self.base_url}/migrations", json=migration_data)
-        assert response.status_code == 201, f"Migration create failed: {response.text}"
-        migration = response.json()
+        response = self.client.post("/migrations", json=migration_data)
+        assert response.status_code == 201, f"Migration create failed: {response.get_data(as_text=True)}"
+        migration = response.get_json()
         migration_id = migration['id']
         print("✓ Migration created successfully")
         
 
-        response = self.session.get(f"{self.base_url}/migrations/{migration_id}/status")
-        assert response.status_code == 200, f"Status check failed: {response.text}"
-        status = response.json()
+        response = self.client.get(f"/migrations/{migration_id}/status")
+        assert response.status_code == 200, f"Status check failed: {response.get_data(as_text=True)}"
+        status = response.get_json()
         assert status['state'] == 'not_started', "Migration should be not started"
         print("✓ Migration status retrieved successfully")
         
 
         start_data = {"sleep_minutes": 0.01} 
-        response = self.session.post(f"{self.base_url}/migrations/{migration_id}/start", json=start_data)
-        assert response.status_code == 200, f"Migration start failed: {response.text}"
+        response = self.client.post(f"/migrations/{migration_id}/start", json=start_data)
+        assert response.status_code == 202, f"Migration start failed: {response.get_data(as_text=True)}"
         print("✓ Migration started successfully")
         
 
-        response = self.session.get(f"{self.base_url}/migrations/{migration_id}/status")
-        assert response.status_code == 200, f"Final status check failed: {response.text}"
-        status = response.json()
+        for _ in range(100):
+            response = self.client.get(f"/migrations/{migration_id}/status")
+            assert response.status_code == 200, f"Final status check failed: {response.get_data(as_text=True)}"
+            status = response.get_json()
+            if status['finished']:
+                break
+            time.sleep(0.1)
         assert status['state'] == 'success', f"Migration should be successful, got: {status['state']}"
         assert status['finished'] == True, "Migration should be finished"
         print("✓ Migration completed successfully")
         
 
-        response = self.session.get(f"{self.base_url}/migrations")
-        assert response.status_code == 200, f"List migrations failed: {response.text}"
-        migrations = response.json()
+        response = self.client.get("/migrations")
+        assert response.status_code == 200, f"List migrations failed: {response.get_data(as_text=True)}"
+        migrations = response.get_json()
         assert len(migrations) >= 1, "Should have at least one migration"
         print("✓ Migrations listed successfully")
     
@@ -153,68 +101,35 @@ class APITestHarness:
         print("\nTesting error cases...")
         
 
-        invalid_migration = {
-            "selected_mount_points": [
-                {
-                    "mount_point_name": "D:\\",
-                    "total_size": 2000
-                }
-            ],
-            "source": {
-                "ip": "192.168.1.1",
-                "credentials": {
-                    "username": "testuser",
-                    "password": "testpass",
-                    "domain": "testdomain.com"
-                },
-                "storage": {
-                    "mount_points": [
-                        {
-                            "mount_point_name": "C:\\",
-                            "total_size": 1000
-                        },
-                        {
-                            "mount_point_name": "D:\\",
-                            "total_size": 2000
-                        }
-                    ]
-                }
-            },
-            "migration_target": {
-                "cloud_type": "aws",
-                "cloud_credentials": {
-                    "username": "clouduser",
-                    "password": "cloudpass",
-                    "domain": "cloud.com"
-                },
-                "target_vm": {
-                    "ip": "192.168.1.100",
-                    "credentials": {
-                        "username": "targetuser",
-                        "password": "targetpass",
-                        "domain": "target.com"
-                    },
-                    "storage": {
-                        "mount_points": []
-                    }
-                }
+        invalid_migration = copy.deepcopy(MIGRATION)
+        invalid_migration['source']['storage'] = copy.deepcopy(WORKLOAD['storage'])
+        invalid_migration['selected_mount_points'] = [
+            {
+                "mount_point_name": "D:\\",
+                "total_size": 2000
             }
-        }
+        ]
         
-        response = self.session.post(f"{self.base_url}/migrations", json=invalid_migration)
+        response = self.client.post("/migrations", json=invalid_migration)
         assert response.status_code == 400, "Should reject migration without C: drive"
         print("✓ Migration without C: drive correctly rejected")
         
-        response = self.session.get(f"{self.base_url}/workloads/192.168.1.99")
+        response = self.client.get("/workloads/192.168.1.99")
         assert response.status_code == 404, "Should return 404 for non-existent workload"
         print("✓ Non-existent workload correctly returns 404")
     
+    def check_ready(self):
+        """Fail fast if the app cannot serve a cheap request."""
+        response = self.client.get("/workloads")
+        assert response.status_code == 200, f"API not ready: {response.get_data(as_text=True)}"
+    
     def run_all_tests(self):
         """Run all test cases."""
         print("Starting API Test Harness...")
         print("=" * 50)
         
         try:
+            self.check_ready()
             self.test_workload_crud()
             self.test_migration_operations()
             self.test_error_cases()
@@ -228,8 +143,6 @@ class APITestHarness:
 
 
 if __name__ == "__main__":
-    print("Waiting for server to start...")
-    time.sleep(2)
-    
-    harness = APITestHarness()
-    harness.run_all_tests()
+    with tempfile.TemporaryDirectory() as data_dir:
+        harness = APITestHarness(data_dir)
+        harness.run_all_tests()
@@ -1,9 +1,15 @@
+import copy
+import pickle
 import pytest
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import FrozenInstanceError
 from migration_system.models import (
     Credentials, MountPoint, Storage, Workload,
     MigrationTarget, Migration, CloudType, MigrationState
 )
+from .fixtures.models import DEFAULT_CREDS, CLOUD_CREDS, UPDATED_CREDS
 
 
 class TestCredentials:
@@ -13,12 +19,13 @@ class TestCredentials:
         assert creds.password == "pass"
         assert creds.domain == "domain.com"
 
-    def test_invalid_credentials(self):
+    @pytest.mark.parametrize("username,password,domain", [
+        ("", "pass", "domain.com"),
+        ("user", "", "domain.com"),
+    ])
+    def test_invalid_credentials(self, username, password, domain):
         with pytest.raises(ValueError):
-            Credentials("", "pass", "domain.com")
-
-        with pytest.raises(ValueError):
-            Credentials("user", "", "domain.com")
+            Credentials(username, password, domain)
 
     def test_credentials_serialization(self):
         creds = Credentials("user", "pass", "domain.com")
@@ -28,6 +35,13 @@ class TestCredentials:
         assert restored.password == creds.password
         assert restored.domain == creds.domain
 
+    def test_credentials_immutable(self):
+        creds = Credentials("user", "pass", "domain.com")
+        assert creds.to_dict() is creds.to_dict()
+
+        with pytest.raises(FrozenInstanceError):
+            creds.username = "other"
+
 
 class TestMountPoint:
     def test_valid_mount_point(self):
@@ -35,12 +49,13 @@ class TestMountPoint:
         assert mp.mount_point_name == "C:\\"
         assert mp.total_size == 1000
 
-    def test_invalid_mount_point(self):
-        with pytest.raises(ValueError):
-            MountPoint("", 1000)
-
+    @pytest.mark.parametrize("name,size", [
+        ("", 1000),
+        ("C:\\", -1),
+    ])
+    def test_invalid_mount_point(self, name, size):
         with pytest.raises(ValueError):
-            MountPoint("C:\\", -1)
+            MountPoint(name, size)
 
     def test_mount_point_serialization(self):
         mp = MountPoint("C:\\", 1000)
@@ -67,33 +82,28 @@ class TestStorage:
 
 class TestWorkload:
     def test_valid_workload(self):
-        creds = Credentials("user", "pass", "domain.com")
-        workload = Workload(_ip="192.168.1.1", credentials=creds)
+        workload = Workload(_ip="192.168.1.1", credentials=DEFAULT_CREDS)
         assert workload.ip == "192.168.1.1"
-        assert workload.credentials == creds
+        assert workload.credentials == DEFAULT_CREDS
 
     def test_invalid_workload(self):
-        creds = Credentials("user", "pass", "domain.com")
-
         with pytest.raises(ValueError):
-            Workload(_ip="", credentials=creds)
+            Workload(_ip="", credentials=DEFAULT_CREDS)
 
         with pytest.raises(ValueError):
             Workload(_ip="192.168.1.1", credentials=None)
 
     def test_ip_immutability(self):
-        creds = Credentials("user", "pass", "domain.com")
-        workload = Workload(_ip="192.168.1.1", credentials=creds)
+        workload = Workload(_ip="192.168.1.1", credentials=DEFAULT_CREDS)
 
         with pytest.raises(ValueError):
             workload.ip = "192.168.1.2"
 
     def test_workload_serialization(self):
-        creds = Credentials("user", "pass", "domain.com")
         storage = Storage()
         storage.add_mount_point(MountPoint("C:\\", 1000))
 
-        workload = Workload(_ip="192.168.1.1", credentials=creds, storage=storage)
+        workload = Workload(_ip="192.168.1.1", credentials=DEFAULT_CREDS, storage=storage)
         data = workload.to_dict()
         restored = Workload.from_dict(data)
 
@@ -102,51 +112,87 @@ class TestWorkload:
         assert len(restored.storage.mount_points) == 1
 
 
+    def test_workload_dict_cached_until_changed(self):
+        workload = Workload(_ip="192.168.1.1", credentials=DEFAULT_CREDS)
+        assert not hasattr(workload, "__dict__")
+
+        first = workload.to_dict()
+        assert workload.to_dict() is first
+
+        workload.storage.add_mount_point(MountPoint("C:\\", 1000))
+        second = workload.to_dict()
+        assert second is not first
+        assert len(second["storage"]["mount_points"]) == 1
+
+        workload.credentials = UPDATED_CREDS
+        assert workload.to_dict()["credentials"]["username"] == "user2"
+
+    def test_dict_tracks_in_place_replacement(self):
+        storage = Storage([MountPoint("C:\\", 1000)])
+        assert storage.to_dict()["mount_points"][0]["total_size"] == 1000
+
+        storage.mount_points[0] = MountPoint("C:\\", 3000)
+        assert storage.to_dict()["mount_points"][0]["total_size"] == 3000
+
+
 class TestMigrationTarget:
     def test_valid_migration_target(self):
-        creds = Credentials("user", "pass", "domain.com")
-        cloud_creds = Credentials("cloud_user", "cloud_pass", "cloud.com")
-        target_vm = Workload(_ip="192.168.1.100", credentials=creds)
+        target_vm = Workload(_ip="192.168.1.100", credentials=DEFAULT_CREDS)
 
-        target = MigrationTarget(CloudType.AWS, cloud_creds, target_vm)
+        target = MigrationTarget(CloudType.AWS, CLOUD_CREDS, target_vm)
         assert target.cloud_type == CloudType.AWS
-        assert target.cloud_credentials == cloud_creds
+        assert target.cloud_credentials == CLOUD_CREDS
         assert target.target_vm == target_vm
 
     def test_string_cloud_type_conversion(self):
-        creds = Credentials("user", "pass", "domain.com")
-        cloud_creds = Credentials("cloud_user", "cloud_pass", "cloud.com")
-        target_vm = Workload(_ip="192.168.1.100", credentials=creds)
+        target_vm = Workload(_ip="192.168.1.100", credentials=DEFAULT_CREDS)
 
-        target = MigrationTarget("aws", cloud_creds, target_vm)
+        target = MigrationTarget("aws", CLOUD_CREDS, target_vm)
         assert target.cloud_type == CloudType.AWS
 
     def test_invalid_cloud_type(self):
-        creds = Credentials("user", "pass", "domain.com")
-        cloud_creds = Credentials("cloud_user", "cloud_pass", "cloud.com")
-        target_vm = Workload(_ip="192.168.1.100", credentials=creds)
+        target_vm = Workload(_ip="192.168.1.100", credentials=DEFAULT_CREDS)
 
         with pytest.raises(ValueError):
-            MigrationTarget("invalid_cloud", cloud_creds, target_vm)
+            MigrationTarget("invalid_cloud", CLOUD_CREDS, target_vm)
+
+
+@pytest.fixture(scope="module")
+def migration_template():
+    # State tests hydrate this instead of building and validating a Migration
+    # from scratch; from_dict only reads it, so it can be shared.
+    user = {"username": "user", "password": "pass", "domain": "domain.com"}
+    drives = [
+        {"mount_point_name": "C:\\", "total_size": 1000},
+        {"mount_point_name": "D:\\", "total_size": 2000}
+    ]
+    return {
+        "id": "1700000000000",
+        "selected_mount_points": drives,
+        "source": {"ip": "192.168.1.1", "credentials": user, "storage": {"mount_points": drives}},
+        "migration_target": {
+            "cloud_type": "aws",
+            "cloud_credentials": {"username": "cloud_user", "password": "cloud_pass", "domain": "cloud.com"},
+            "target_vm": {"ip": "192.168.1.100", "credentials": user, "storage": {"mount_points": []}}
+        },
+        "migration_state": "not_started",
+        "created_at": "2024-01-01T00:00:00"
+    }
 
 
 class TestMigration:
-    def test_valid_migration(self):
-        # Setup
-        creds = Credentials("user", "pass", "domain.com")
-        cloud_creds = Credentials("cloud_user", "cloud_pass", "cloud.com")
+    @pytest.fixture(autouse=True)
+    def _no_sleep(self, monkeypatch):
+        monkeypatch.setattr("migration_system.models.time.sleep", lambda *_: None)
 
-        # Source with C: and D: drives
-        source_storage = Storage()
-        c_drive = MountPoint("C:\\", 1000)
-        d_drive = MountPoint("D:\\", 2000)
-        source_storage.add_mount_point(c_drive)
-        source_storage.add_mount_point(d_drive)
-        source = Workload(_ip="192.168.1.1", credentials=creds, storage=source_storage)
-
-        # Target
+    @pytest.fixture
+    def target(self, creds, cloud_creds):
         target_vm = Workload(_ip="192.168.1.100", credentials=creds)
-        target = MigrationTarget(CloudType.AWS, cloud_creds, target_vm)
+        return MigrationTarget(CloudType.AWS, cloud_creds, target_vm)
+
+    def test_valid_migration(self, creds, c_drive, fresh_source_storage, target):
+        # Source with C: and D: drives
+        source = Workload(_ip="192.168.1.1", credentials=creds, storage=fresh_source_storage)
 
         # Migration with C: selected (required)
         selected_mps = [c_drive]
@@ -156,22 +202,9 @@ class TestMigration:
         assert len(migration.selected_mount_points) == 1
         assert migration.selected_mount_points[0] == c_drive
 
-    def test_migration_without_c_drive_fails(self):
-        # Setup
-        creds = Credentials("user", "pass", "domain.com")
-        cloud_creds = Credentials("cloud_user", "cloud_pass", "cloud.com")
-
+    def test_migration_without_c_drive_fails(self, creds, d_drive, fresh_source_storage, target):
         # Source with C: and D: drives
-        source_storage = Storage()
-        c_drive = MountPoint("C:\\", 1000)
-        d_drive = MountPoint("D:\\", 2000)
-        source_storage.add_mount_point(c_drive)
-        source_storage.add_mount_point(d_drive)
-        source = Workload(_ip="192.168.1.1", credentials=creds, storage=source_storage)
-
-        # Target
-        target_vm = Workload(_ip="192.168.1.100", credentials=creds)
-        target = MigrationTarget(CloudType.AWS, cloud_creds, target_vm)
+        source = Workload(_ip="192.168.1.1", credentials=creds, storage=fresh_source_storage)
 
         # Migration without C: selected (should fail)
         selected_mps = [d_drive]
@@ -179,46 +212,68 @@ class TestMigration:
         with pytest.raises(ValueError, match="C:\\\\ drive must be selected"):
             Migration(selected_mps, source, target)
 
-    def test_migration_run(self):
-        # Setup
-        creds = Credentials("user", "pass", "domain.com")
-        cloud_creds = Credentials("cloud_user", "cloud_pass", "cloud.com")
+    def test_models_use_slots(self, migration_template):
+        migration = Migration.from_dict(migration_template)
+        target = migration.migration_target
+        instances = [
+            migration, target, target.cloud_credentials, target.target_vm,
+            migration.source.storage, migration.selected_mount_points[0]
+        ]
 
-        # Source with C: and D: drives
-        source_storage = Storage()
-        c_drive = MountPoint("C:\\", 1000)
-        d_drive = MountPoint("D:\\", 2000)
-        source_storage.add_mount_point(c_drive)
-        source_storage.add_mount_point(d_drive)
-        source = Workload(_ip="192.168.1.1", credentials=creds, storage=source_storage)
-
-        # Target
-        target_vm = Workload(_ip="192.168.1.100", credentials=creds)
-        target = MigrationTarget(CloudType.AWS, cloud_creds, target_vm)
+        for instance in instances:
+            assert not hasattr(instance, "__dict__"), type(instance).__name__
+        assert isinstance(Workload.ip, property)
 
+    def test_migration_copy_and_pickle(self, migration_template):
+        migration = Migration.from_dict(migration_template)
+
+        assert copy.deepcopy(migration).to_dict() == migration.to_dict()
+        assert pickle.loads(pickle.dumps(migration)).to_dict() == migration.to_dict()
+
+    def test_migration_dict_tracks_in_place_replacement(self, migration_template):
+        migration = Migration.from_dict(migration_template)
+        assert migration.to_dict()["selected_mount_points"][1]["mount_point_name"] == "D:\\"
+
+        migration.selected_mount_points[1] = MountPoint("E:\\", 500)
+        assert migration.to_dict()["selected_mount_points"][1]["mount_point_name"] == "E:\\"
+
+    def test_migration_run(self, migration_template):
         # Migration with both drives selected
-        selected_mps = [c_drive, d_drive]
-        migration = Migration(selected_mps, source, target)
+        migration = Migration.from_dict(migration_template)
 
         # Run migration (very short duration for testing)
-        migration.run(sleep_minutes=0.001)  # 0.06 seconds
+        migration.run(sleep_minutes=0.001)
 
         assert migration.migration_state == MigrationState.SUCCESS
         # Target should have both selected mount points
         assert len(migration.migration_target.target_vm.storage.mount_points) == 2
+        assert migration_template["migration_target"]["target_vm"]["storage"]["mount_points"] == []
+
+    def test_migration_run_on_executor(self, monkeypatch, migration_template):
+        release = threading.Event()
+        monkeypatch.setattr("migration_system.models.time.sleep", lambda _: release.wait(5))
+
+        migration = Migration.from_dict(migration_template)
+        states = []
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = migration.run(
+                sleep_minutes=0.001,
+                executor=executor,
+                on_state_change=lambda m: states.append(m.migration_state)
+            )
+            assert states[0] == MigrationState.RUNNING
+            with pytest.raises(ValueError):
+                migration.run(sleep_minutes=0.001)
+            release.set()
+            future.result()
+
+        assert states == [MigrationState.RUNNING, MigrationState.SUCCESS]
+        assert migration.migration_state == MigrationState.SUCCESS
+        assert migration_template["migration_state"] == "not_started"
 
-    def test_migration_serialization(self):
-        # Setup
-        creds = Credentials("user", "pass", "domain.com")
-        cloud_creds = Credentials("cloud_user", "cloud_pass", "cloud.com")
-
-        source_storage = Storage()
-        c_drive = MountPoint("C:\\", 1000)
-        source_storage.add_mount_point(c_drive)
-        source = Workload(_ip="192.168.1.1", credentials=creds, storage=source_storage)
-
-        target_vm = Workload(_ip="192.168.1.100", credentials=creds)
-        target = MigrationTarget(CloudType.AWS, cloud_creds, target_vm)
+    def test_migration_serialization(self, creds, c_drive, target):
+        source = Workload(_ip="192.168.1.1", credentials=creds, storage=Storage([c_drive]))
 
         migration = Migration([c_drive], source, target)
         data = migration.to_dict()
@@ -226,4 +281,9 @@ class TestMigration:
 
         assert restored.id == migration.id
         assert restored.migration_state == migration.migration_state
-        assert len(restored.selected_mount_points) == 1
\ No newline at end of file
+        assert len(restored.selected_mount_points) == 1
+        assert restored.migration_target.cloud_type == CloudType.AWS
+        assert restored.to_dict() == data
+
+        restored.migration_state = MigrationState.SUCCESS
+        assert restored.to_dict()["migration_state"] == "success"
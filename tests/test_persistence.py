@@ -1,132 +1,415 @@
+import json
+import os
 import pytest
 import tempfile
 import shutil
+import sqlite3
 from pathlib import Path
 from migration_system.models import (
-    Credentials, MountPoint, Storage, Workload,
+    MountPoint, Storage, Workload,
     MigrationTarget, Migration, CloudType
 )
 from migration_system.persistence import (
     WorkloadManager, MigrationManager,
-    DuplicateIPError, ObjectNotFoundError
+    SqliteWorkloadManager, SqliteMigrationManager,
+    InMemoryWorkloadManager, InMemoryMigrationManager,
+    DuplicateIPError, ObjectNotFoundError, PersistenceError
 )
+from .fixtures.models import UPDATED_CREDS
 
 
-class TestWorkloadManager:
-    def setup_method(self):
-        self.temp_dir = tempfile.mkdtemp()
-        self.manager = WorkloadManager(self.temp_dir)
+# Keep test storage in RAM where tmpfs is available, so file writes skip the disk.
+_RAM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+
+
+def _fast_rmtree(path):
+    """Remove a flat directory of files, falling back to shutil.rmtree for anything else."""
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                os.unlink(entry.path)
+        os.rmdir(path)
+    except OSError:
+        shutil.rmtree(path)
+
+
+@pytest.fixture(scope="class")
+def storage_dir(tmp_path_factory):
+    """One storage directory per test class, in RAM when tmpfs is available."""
+    if _RAM_DIR is None:
+        yield tmp_path_factory.mktemp("storage")
+        return
+    path = Path(tempfile.mkdtemp(dir=_RAM_DIR))
+    yield path
+    _fast_rmtree(path)
+
+
+def _reset_storage(storage_dir, manager):
+    """Empty a pooled manager and its directory between tests."""
+    for path in storage_dir.iterdir():
+        path.unlink()
+    manager.reload()
+
+
+@pytest.fixture(scope="class")
+def workload_manager(storage_dir):
+    return WorkloadManager(str(storage_dir))
+
+
+@pytest.fixture(scope="class")
+def migration_manager(storage_dir):
+    return MigrationManager(str(storage_dir))
+
+
+@pytest.fixture(scope="class", params=[WorkloadManager, InMemoryWorkloadManager])
+def crud_workload_manager(request, storage_dir):
+    return request.param(str(storage_dir))
 
-    def teardown_method(self):
-        shutil.rmtree(self.temp_dir)
 
-    def test_create_workload(self):
-        creds = Credentials("user", "pass", "domain.com")
-        workload = Workload(_ip="192.168.1.1", credentials=creds)
+_CRUD_IPS = ["192.168.1.1", "10.0.0.7"]
 
-        created = self.manager.create_workload(workload)
-        assert created.ip == workload.ip
 
+class TestWorkloadCrud:
+    """CRUD behaviour shared by the file-backed and in-memory workload managers."""
 
-        file_path = Path(self.temp_dir) / "workload_192.168.1.1.json"
-        assert file_path.exists()
+    @pytest.fixture
+    def manager(self, storage_dir, crud_workload_manager):
+        self.temp_dir = str(storage_dir)
+        yield crud_workload_manager
+        _reset_storage(storage_dir, crud_workload_manager)
 
-    def test_duplicate_ip_error(self):
-        creds = Credentials("user", "pass", "domain.com")
-        workload1 = Workload(_ip="192.168.1.1", credentials=creds)
-        workload2 = Workload(_ip="192.168.1.1", credentials=creds)
+    @pytest.fixture
+    def created(self, manager, creds, ip):
+        return manager.create_workload(Workload(_ip=ip, credentials=creds))
 
-        self.manager.create_workload(workload1)
+    @pytest.mark.parametrize("ip", _CRUD_IPS)
+    def test_create(self, manager, created, ip):
+        assert created.ip == ip
+        file_path = Path(self.temp_dir) / f"workload_{ip}.json"
+        assert file_path.exists() == (type(manager) is WorkloadManager)
 
+    @pytest.mark.parametrize("ip", _CRUD_IPS)
+    def test_create_duplicate(self, manager, created, creds, ip):
         with pytest.raises(DuplicateIPError):
-            self.manager.create_workload(workload2)
+            manager.create_workload(Workload(_ip=ip, credentials=creds))
 
-    def test_read_workload(self):
-        creds = Credentials("user", "pass", "domain.com")
-        original = Workload(_ip="192.168.1.1", credentials=creds)
+    @pytest.mark.parametrize("ip", _CRUD_IPS)
+    def test_read(self, manager, created, creds, ip):
+        retrieved = manager.read_workload(ip)
+        assert retrieved.ip == ip
+        assert retrieved.credentials.username == creds.username
 
-        self.manager.create_workload(original)
-        retrieved = self.manager.read_workload("192.168.1.1")
+    @pytest.mark.parametrize("ip", _CRUD_IPS)
+    def test_update(self, manager, created, ip):
+        workload = Workload(_ip=ip, credentials=UPDATED_CREDS)
+        updated = manager.update_workload(workload)
 
-        assert retrieved.ip == original.ip
-        assert retrieved.credentials.username == original.credentials.username
+        assert updated is not workload
+        assert updated.credentials.username == "user2"
+        assert manager.read_workload(ip).to_dict() == updated.to_dict()
+
+    @pytest.mark.parametrize("ip", _CRUD_IPS)
+    def test_delete(self, manager, created, ip):
+        manager.delete_workload(ip)
+        with pytest.raises(ObjectNotFoundError):
+            manager.read_workload(ip)
+
+
+class TestWorkloadManager:
+    @pytest.fixture(autouse=True)
+    def _manager(self, storage_dir, workload_manager):
+        self.temp_dir = str(storage_dir)
+        self.manager = workload_manager
+        yield
+        _reset_storage(storage_dir, workload_manager)
+
+    def test_create_workloads_batch(self, creds):
+        created = self.manager.create_workloads([
+            Workload(_ip="192.168.1.1", credentials=creds),
+            Workload(_ip="192.168.1.2", credentials=creds)
+        ])
+        assert [w.ip for w in created] == ["192.168.1.1", "192.168.1.2"]
+
+        with pytest.raises(DuplicateIPError):
+            self.manager.create_workloads([
+                Workload(_ip="192.168.1.3", credentials=creds),
+                Workload(_ip="192.168.1.1", credentials=creds)
+            ])
+        with pytest.raises(DuplicateIPError):
+            self.manager.create_workloads([
+                Workload(_ip="192.168.1.4", credentials=creds),
+                Workload(_ip="192.168.1.4", credentials=creds)
+            ])
+
+        reloaded = WorkloadManager(self.temp_dir).list_all_workloads()
+        assert sorted(w.ip for w in reloaded) == ["192.168.1.1", "192.168.1.2"]
+
+    def test_create_workloads_batch_cleans_up_on_write_error(self, creds, monkeypatch):
+        manager = WorkloadManager(self.temp_dir)
+        write_file = manager._write_file
+        calls = []
+
+        def failing_write_file(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            write_file(*args, **kwargs)
+
+        monkeypatch.setattr(manager, "_write_file", failing_write_file)
+        with pytest.raises(OSError):
+            manager.create_workloads([
+                Workload(_ip="192.168.1.1", credentials=creds),
+                Workload(_ip="192.168.1.2", credentials=creds)
+            ])
+
+        assert list(Path(self.temp_dir).iterdir()) == []
+        assert manager.list_all_workloads() == []
+
+    def test_duplicate_ip_detected_by_new_manager(self, creds):
+        self.manager.create_workload(Workload(_ip="192.168.1.1", credentials=creds))
+
+        other_manager = WorkloadManager(self.temp_dir)
+        with pytest.raises(DuplicateIPError):
+            other_manager.create_workload(Workload(_ip="192.168.1.1", credentials=creds))
+
+    def test_index_loaded_on_first_use(self, creds):
+        idle_manager = WorkloadManager(self.temp_dir)
+        self.manager.create_workload(Workload(_ip="192.168.1.1", credentials=creds))
+
+        with pytest.raises(DuplicateIPError):
+            idle_manager.create_workload(Workload(_ip="192.168.1.1", credentials=creds))
+
+    def test_reload_picks_up_external_writes(self, creds):
+        assert self.manager.list_all_workloads() == []
+        WorkloadManager(self.temp_dir).create_workload(Workload(_ip="192.168.1.1", credentials=creds))
+        version = self.manager.version
+
+        self.manager.reload()
+
+        assert self.manager.version > version
+        assert self.manager.read_workload("192.168.1.1").ip == "192.168.1.1"
+
+    def test_recreate_after_delete(self, creds):
+        self.manager.create_workload(Workload(_ip="192.168.1.1", credentials=creds))
+        self.manager.delete_workload("192.168.1.1")
+
+        recreated = self.manager.create_workload(Workload(_ip="192.168.1.1", credentials=creds))
+        assert recreated.ip == "192.168.1.1"
 
     def test_read_nonexistent_workload(self):
         with pytest.raises(ObjectNotFoundError):
             self.manager.read_workload("nonexistent.ip")
 
-    def test_update_workload(self):
-        creds1 = Credentials("user1", "pass1", "domain1.com")
-        workload1 = Workload(_ip="192.168.1.1", credentials=creds1)
-        self.manager.create_workload(workload1)
+    def test_read_encoded_workload(self, creds):
+        workload = self.manager.create_workload(Workload(_ip="192.168.1.1", credentials=creds))
+        assert json.loads(self.manager.read_encoded_workload("192.168.1.1")) == workload.to_dict()
 
-        creds2 = Credentials("user2", "pass2", "domain2.com")
-        workload2 = Workload(_ip="192.168.1.1", credentials=creds2)  
+        self.manager.update_workload(
+            Workload(_ip="192.168.1.1", credentials=UPDATED_CREDS)
+        )
+        encoded = self.manager.read_encoded_workload("192.168.1.1")
+        assert json.loads(encoded)["credentials"]["username"] == "user2"
 
-        updated = self.manager.update_workload(workload2)
-        assert updated.credentials.username == "user2"
+        with pytest.raises(ObjectNotFoundError):
+            self.manager.read_encoded_workload("192.168.1.99")
 
+    def test_writes_leave_no_temp_files(self, creds):
+        manager = WorkloadManager(self.temp_dir, durable=True)
+        manager.create_workload(Workload(_ip="192.168.1.1", credentials=creds))
+        manager.update_workload(Workload(_ip="192.168.1.1", credentials=creds))
 
-        retrieved = self.manager.read_workload("192.168.1.1")
-        assert retrieved.credentials.username == "user2"
+        assert [p.name for p in Path(self.temp_dir).iterdir()] == ["workload_192.168.1.1.json"]
+        if os.name == "posix":
+            file_mode = (Path(self.temp_dir) / "workload_192.168.1.1.json").stat().st_mode
+            assert file_mode & 0o777 == 0o600
+        assert WorkloadManager(self.temp_dir).read_workload("192.168.1.1").ip == "192.168.1.1"
 
-    def test_delete_workload(self):
-        creds = Credentials("user", "pass", "domain.com")
-        workload = Workload(_ip="192.168.1.1", credentials=creds)
-        self.manager.create_workload(workload)
+    def test_failed_write_leaves_no_temp_file(self, creds, monkeypatch):
+        def failing_write(fd, data):
+            raise OSError("disk full")
 
-        self.manager.delete_workload("192.168.1.1")
+        monkeypatch.setattr("migration_system.persistence.os.write", failing_write)
+        with pytest.raises(OSError):
+            self.manager.create_workload(Workload(_ip="192.168.1.1", credentials=creds))
 
+        assert list(Path(self.temp_dir).iterdir()) == []
         with pytest.raises(ObjectNotFoundError):
             self.manager.read_workload("192.168.1.1")
 
+    def test_list_reflects_writes(self, creds):
+        self.manager.create_workload(Workload(_ip="192.168.1.1", credentials=creds))
+        self.manager.create_workload(Workload(_ip="192.168.1.2", credentials=creds))
+        self.manager.update_workload(
+            Workload(_ip="192.168.1.2", credentials=UPDATED_CREDS)
+        )
+        self.manager.delete_workload("192.168.1.1")
+
+        workloads = self.manager.list_all_workloads()
+        assert [w.ip for w in workloads] == ["192.168.1.2"]
+        assert workloads[0].credentials.username == "user2"
+
+        reloaded = WorkloadManager(self.temp_dir).list_all_workloads()
+        assert [w.to_dict() for w in reloaded] == [w.to_dict() for w in workloads]
 
-class TestMigrationManager:
-    def setup_method(self):
-        self.temp_dir = tempfile.mkdtemp()
-        self.manager = MigrationManager(self.temp_dir)
 
-        
-        self.creds = Credentials("user", "pass", "domain.com")
-        self.cloud_creds = Credentials("cloud_user", "cloud_pass", "cloud.com")
+@pytest.fixture(scope="module")
+def source(creds, c_drive):
+    return Workload(_ip="192.168.1.1", credentials=creds, storage=Storage([c_drive]))
 
-        self.source_storage = Storage()
-        self.c_drive = MountPoint("C:\\", 1000)
-        self.source_storage.add_mount_point(self.c_drive)
 
-        self.source = Workload(_ip="192.168.1.1", credentials=self.creds, storage=self.source_storage)
-        self.target_vm = Workload(_ip="192.168.1.100", credentials=self.creds)
-        self.target = MigrationTarget(CloudType.AWS, self.cloud_creds, self.target_vm)
+@pytest.fixture(scope="module")
+def target(creds, cloud_creds):
+    target_vm = Workload(_ip="192.168.1.100", credentials=creds)
+    return MigrationTarget(CloudType.AWS, cloud_creds, target_vm)
 
-    def teardown_method(self):
-        shutil.rmtree(self.temp_dir)
 
-    def test_create_migration(self):
-        migration = Migration([self.c_drive], self.source, self.target)
+class TestMigrationManager:
+    @pytest.fixture(autouse=True)
+    def _manager(self, storage_dir, migration_manager):
+        self.temp_dir = str(storage_dir)
+        self.manager = migration_manager
+        yield
+        _reset_storage(storage_dir, migration_manager)
+
+    def test_create_migration(self, c_drive, source, target):
+        migration = Migration([c_drive], source, target)
         created = self.manager.create_migration(migration)
 
         assert created.id == migration.id
         assert (Path(self.temp_dir) / f"migration_{migration.id}.json").exists()
 
-    def test_migration_crud_operations(self):
+    def test_create_migrations_batch(self, c_drive, source, target):
+        migrations = [
+            Migration([c_drive], source, target, id=migration_id)
+            for migration_id in ("1", "2")
+        ]
+        self.manager.create_migrations(migrations)
+
+        reloaded = MigrationManager(self.temp_dir).list_all_migrations()
+        assert sorted(m.id for m in reloaded) == ["1", "2"]
+
+    def test_in_memory_manager_leaves_no_files(self, c_drive, source, target, tmp_path):
+        manager = InMemoryMigrationManager(str(tmp_path / "unused"))
+        migration = manager.create_migration(Migration([c_drive], source, target))
 
-        migration = Migration([self.c_drive], self.source, self.target)
+        assert manager.read_migration(migration.id).to_dict() == migration.to_dict()
+        assert not (tmp_path / "unused").exists()
+
+    def test_migration_crud_operations(self, creds, cloud_creds, c_drive, source, target):
+        migration = Migration([c_drive], source, target)
         created = self.manager.create_migration(migration)
         migration_id = created.id
 
-
+        # read_migration hands back a fresh object, so retargeting it leaves the fixtures alone.
         retrieved = self.manager.read_migration(migration_id)
         assert retrieved.id == migration_id
 
-        new_target_vm = Workload(_ip="192.168.1.200", credentials=self.creds)
-        new_target = MigrationTarget(CloudType.AZURE, self.cloud_creds, new_target_vm)
+        new_target_vm = Workload(_ip="192.168.1.200", credentials=creds)
+        new_target = MigrationTarget(CloudType.AZURE, cloud_creds, new_target_vm)
         retrieved.migration_target = new_target
 
         updated = self.manager.update_migration(retrieved)
         assert updated.migration_target.target_vm.ip == "192.168.1.200"
         assert updated.migration_target.cloud_type == CloudType.AZURE
-
+        assert target.cloud_type == CloudType.AWS
 
         self.manager.delete_migration(migration_id)
         with pytest.raises(ObjectNotFoundError):
             self.manager.read_migration(migration_id)
+
+
+@pytest.fixture(scope="class")
+def sqlite_workload_manager(storage_dir):
+    manager = SqliteWorkloadManager(str(storage_dir))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture(scope="class")
+def sqlite_migration_manager(storage_dir):
+    manager = SqliteMigrationManager(str(storage_dir))
+    yield manager
+    manager.close()
+
+
+class TestSqliteManagers:
+    @pytest.fixture(autouse=True)
+    def _managers(self, storage_dir, sqlite_workload_manager, sqlite_migration_manager):
+        self.temp_dir = str(storage_dir)
+        self.workloads = sqlite_workload_manager
+        self.migrations = sqlite_migration_manager
+        yield
+        # The database stays open, so empty it through the managers instead of
+        # removing the file; reload first to see rows written by other managers.
+        self.workloads.reload()
+        self.migrations.reload()
+        for workload in self.workloads.list_all_workloads():
+            self.workloads.delete_workload(workload.ip)
+        for migration in self.migrations.list_all_migrations():
+            self.migrations.delete_migration(migration.id)
+
+    def _stored_row(self, ip):
+        db = sqlite3.connect(str(Path(self.temp_dir) / SqliteWorkloadManager.DB_FILENAME))
+        try:
+            return db.execute("SELECT 1 FROM workloads WHERE id = ?", (ip,)).fetchone()
+        finally:
+            db.close()
+
+    def test_workload_crud(self, creds):
+        self.workloads.create_workload(Workload(_ip="192.168.1.1", credentials=creds))
+        assert self._stored_row("192.168.1.1")
+        with pytest.raises(DuplicateIPError):
+            self.workloads.create_workload(Workload(_ip="192.168.1.1", credentials=creds))
+
+        self.workloads.update_workload(
+            Workload(_ip="192.168.1.1", credentials=UPDATED_CREDS)
+        )
+        assert self.workloads.read_workload("192.168.1.1").credentials.username == "user2"
+        assert not list(Path(self.temp_dir).glob("workload_*.json"))
+
+        self.workloads.delete_workload("192.168.1.1")
+        assert self._stored_row("192.168.1.1") is None
+        with pytest.raises(ObjectNotFoundError):
+            self.workloads.read_workload("192.168.1.1")
+
+    def test_create_workloads_batch_rolls_back(self, creds):
+        # Store the conflicting row behind the pooled manager's loaded index, so
+        # its duplicate check passes and the database rollback is exercised.
+        assert self.workloads.list_all_workloads() == []
+        other = SqliteWorkloadManager(self.temp_dir)
+        try:
+            other.create_workload(Workload(_ip="192.168.1.2", credentials=creds))
+        finally:
+            other.close()
+
+        with pytest.raises(PersistenceError):
+            self.workloads.create_workloads([
+                Workload(_ip="192.168.1.1", credentials=creds),
+                Workload(_ip="192.168.1.2", credentials=creds)
+            ])
+
+        reopened = SqliteWorkloadManager(self.temp_dir)
+        try:
+            assert [w.ip for w in reopened.list_all_workloads()] == ["192.168.1.2"]
+        finally:
+            reopened.close()
+
+    def test_data_survives_reopen(self, creds):
+        storage = Storage()
+        c_drive = MountPoint("C:\\", 1000)
+        storage.add_mount_point(c_drive)
+        source = Workload(_ip="192.168.1.1", credentials=creds, storage=storage)
+        target = MigrationTarget(
+            CloudType.AWS, creds, Workload(_ip="192.168.1.100", credentials=creds)
+        )
+        migration = self.migrations.create_migration(Migration([c_drive], source, target))
+        self.workloads.create_workload(source)
+
+        reopened_workloads = SqliteWorkloadManager(self.temp_dir)
+        reopened_migrations = SqliteMigrationManager(self.temp_dir)
+        try:
+            assert [w.ip for w in reopened_workloads.list_all_workloads()] == ["192.168.1.1"]
+            assert reopened_migrations.read_migration(migration.id).to_dict() == migration.to_dict()
+        finally:
+            reopened_workloads.close()
+            reopened_migrations.close()